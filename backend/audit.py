@@ -0,0 +1,166 @@
+"""
+Audit log - AuditLog rows written off the request path.
+
+audit_log.record() queues an event for a background thread, which inserts
+queued events as one multi-row INSERT per batch (up to AUDIT_BATCH_SIZE
+events, at least every AUDIT_FLUSH_SECONDS). The queue holds AUDIT_QUEUE_SIZE
+events; when it is full, record() writes the event itself rather than drop it.
+Queued events are flushed when the process exits normally, so only a crash or
+SIGKILL can lose the last few seconds of events.
+
+With AUDIT_DURABILITY=sync, record() instead inserts the event in its own
+transaction before returning. In both modes the event is independent of the
+caller's transaction: record it after committing the change it describes.
+"""
+
+from database import db, AuditLog
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+AUDIT_DURABILITY = os.getenv('AUDIT_DURABILITY', 'async')
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_SECONDS = float(os.getenv('AUDIT_FLUSH_SECONDS', '1'))
+AUDIT_SHUTDOWN_SECONDS = float(os.getenv('AUDIT_SHUTDOWN_SECONDS', '10'))
+WRITE_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Batches AuditLog inserts on a background thread (or writes them inline in sync mode)"""
+
+    def __init__(self, durability=AUDIT_DURABILITY, maxsize=AUDIT_QUEUE_SIZE,
+                 batch_size=AUDIT_BATCH_SIZE, flush_seconds=AUDIT_FLUSH_SECONDS):
+        if durability not in ('async', 'sync'):
+            raise ValueError("AUDIT_DURABILITY must be 'async' or 'sync'")
+        self.durability = durability
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.app = None
+        self.written = 0
+        self.failed = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        if self.app is None:
+            atexit.register(self.close)
+        self.app = app
+
+    def record(self, action, user_id=None, details=None, entity_type=None, entity_id=None, ip_address=None):
+        event = {
+            'user_id': user_id,
+            'action': action,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'details': details,
+            'ip_address': ip_address,
+            'created_at': datetime.utcnow(),
+        }
+        if self.durability == 'sync' or self.app is None:
+            self._insert([event])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.warning("Audit queue full, writing event inline")
+            self._insert([event])
+
+    def flush(self):
+        """Block until every event queued so far has been written (or given up on)"""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self, timeout=AUDIT_SHUTDOWN_SECONDS):
+        """Write queued events and stop the writer thread"""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                return
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.error("Audit writer did not drain its queue before shutdown")
+                return
+            self._thread.join(timeout)
+            self._thread = None
+            self._pid = None
+
+    def _ensure_started(self):
+        # Started in the process that records, so a preloading gunicorn master
+        # does not hand its workers a writer thread that no longer exists
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.maxsize)
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _insert(self, events):
+        app = self.app or current_app._get_current_object()
+        with app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(insert(AuditLog.__table__).values(events))
+
+    def _write(self, batch):
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                self._insert(batch)
+                self.written += len(batch)
+                return
+            except Exception:
+                logger.exception("Writing %d audit events failed (attempt %d)", len(batch), attempt + 1)
+                if attempt + 1 < WRITE_ATTEMPTS:
+                    time.sleep(2 ** attempt)
+        self.failed += len(batch)
+        # Keep the events somewhere rather than losing them silently
+        logger.error("Dropped audit events: %s", json.dumps(batch, default=str))
+
+    def _next_batch(self, first):
+        """first plus whatever else arrives within flush_seconds, and whether to stop after it"""
+        batch = [first]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event is _STOP:
+                return batch, True
+            batch.append(event)
+        return batch, False
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                self._queue.task_done()
+                return
+            batch, stop = self._next_batch(event)
+            self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+
+audit_log = AuditWriter()
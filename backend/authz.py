@@ -0,0 +1,98 @@
+"""
+Authorization - JWT role checks backed by a short-lived principal cache.
+
+Login embeds the user's role and customer id as token claims. Protected views
+use login_required / admin_required / roles_required, which resolve the caller
+once per request from an in-process cache instead of loading the User row.
+Cached principals expire after AUTHZ_CACHE_TTL seconds (default 30), so a
+deactivated account or a role change takes effect within that bound in every
+worker, and immediately in the worker that made the change.
+"""
+
+from cache import TTLCache
+from database import db, Customer, User
+from flask import g, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from functools import wraps
+from types import SimpleNamespace
+import os
+
+STAFF_ROLES = ('admin', 'billing')
+
+principal_cache = TTLCache(ttl=int(os.getenv('AUTHZ_CACHE_TTL', '30')))
+_MISSING = object()
+
+
+def token_claims(user):
+    """Additional JWT claims issued at login"""
+    return {
+        'role': user.role,
+        'customer_id': user.customer.id if user.customer else None,
+    }
+
+
+def invalidate_principal(user_id):
+    """Forget a cached principal after the user's role, status or customer changes"""
+    principal_cache.delete(int(user_id))
+
+
+def _load_principal(user_id):
+    row = db.session.query(
+        User.id, User.role, User.is_active, User.is_approved, Customer.id.label('customer_id')
+    ).outerjoin(Customer, Customer.user_id == User.id).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return SimpleNamespace(
+        user_id=row.id,
+        role=row.role,
+        is_active=row.is_active,
+        is_approved=row.is_approved,
+        customer_id=row.customer_id,
+    )
+
+
+def current_principal():
+    """The caller's user id, role and customer id, or None if the account is gone.
+
+    Resolved once per request; a token whose role claim no longer matches the
+    account is treated as revoked.
+    """
+    if 'principal' in g:
+        return g.principal
+
+    user_id = int(get_jwt_identity())
+    principal = principal_cache.get(user_id, _MISSING)
+    if principal is _MISSING:
+        principal = _load_principal(user_id)
+        principal_cache.set(user_id, principal)
+
+    # Tokens issued before role claims existed carry no role; trust the account
+    if principal is not None and get_jwt().get('role', principal.role) != principal.role:
+        principal = None
+
+    g.principal = principal
+    return principal
+
+
+def is_staff(principal):
+    return principal.role in STAFF_ROLES
+
+
+def roles_required(*roles, message='Access denied'):
+    """Require a valid JWT for an active account, with one of roles if any are given"""
+    def decorator(f):
+        @wraps(f)
+        @jwt_required()
+        def decorated_function(*args, **kwargs):
+            principal = current_principal()
+            if principal is None or not principal.is_active:
+                return jsonify({'error': 'Account is inactive or token revoked, please log in again'}), 401
+            if roles and principal.role not in roles:
+                return jsonify({'error': message}), 403
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+login_required = roles_required()
+admin_required = roles_required(*STAFF_ROLES, message='Admin access required')
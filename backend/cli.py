@@ -0,0 +1,96 @@
+"""
+Flask CLI commands for maintenance jobs.
+Run with: flask --app app <command>
+"""
+
+import json
+from datetime import datetime
+
+import click
+
+
+def register_commands(app):
+    """Register maintenance commands on the app"""
+
+    @app.cli.command('update-bill-status')
+    @click.option('--as-of', default=None, help='Date to evaluate statuses against (YYYY-MM-DD, default today)')
+    def update_bill_status(as_of):
+        """Move bills between pending/sent/overdue."""
+        from services.bill_status_service import BillStatusService
+        as_of_date = datetime.fromisoformat(as_of).date() if as_of else None
+        result = BillStatusService().run(as_of_date)
+        click.echo(json.dumps(result, indent=2, default=str))
+
+    @app.cli.command('render-statements')
+    @click.option('--output-dir', default=None, help='Statement output directory (default STATEMENT_OUTPUT_DIR or ./statements)')
+    @click.option('--workers', default=None, type=int, help='Render processes (default CPU count)')
+    @click.option('--chunk-size', default=1000, type=int, help='Bills fetched per query')
+    @click.option('--start-date', default=None, help='Only bills whose period ends on/after this date')
+    @click.option('--end-date', default=None, help='Only bills whose period starts on/before this date')
+    @click.option('--force', is_flag=True, help='Re-render statements even if unchanged')
+    def render_statements(output_dir, workers, chunk_size, start_date, end_date, force):
+        """Render HTML statements for bills in parallel."""
+        from services.statement_service import StatementService
+        service = StatementService(output_dir=output_dir, workers=workers, chunk_size=chunk_size)
+        result = service.run(
+            start_date=datetime.fromisoformat(start_date).date() if start_date else None,
+            end_date=datetime.fromisoformat(end_date).date() if end_date else None,
+            force=force
+        )
+        click.echo(json.dumps(result, indent=2, default=str))
+
+    @app.cli.command('reconcile-bills')
+    @click.option('--start-date', default=None, help='Only bills whose period ends on/after this date')
+    @click.option('--end-date', default=None, help='Only bills whose period starts on/before this date')
+    @click.option('--rebill', is_flag=True, help='Correct discrepant unpaid bills')
+    def reconcile_bills(start_date, end_date, rebill):
+        """Reconcile stored bills against usage and effective rates."""
+        from services.reconciliation_service import ReconciliationService
+        result = ReconciliationService().run(
+            start_date=datetime.fromisoformat(start_date).date() if start_date else None,
+            end_date=datetime.fromisoformat(end_date).date() if end_date else None,
+            rebill=rebill
+        )
+        result.pop('sample', None)
+        click.echo(json.dumps(result, indent=2, default=str))
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--start-date', default=None, help='First month to rebuild (default: earliest usage)')
+    @click.option('--end-date', default=None, help='Last month to rebuild (default: latest usage)')
+    def rebuild_rollups(start_date, end_date):
+        """Recompute usage rollup tables from water_usage (backfills/repair)."""
+        from services.rollup_service import RollupService
+        result = RollupService().run_rebuild(
+            datetime.fromisoformat(start_date).date() if start_date else None,
+            datetime.fromisoformat(end_date).date() if end_date else None
+        )
+        click.echo(json.dumps(result, indent=2, default=str))
+
+    @app.cli.command('recount-stats')
+    def recount_stats():
+        """Recount the admin dashboard counters exactly (run periodically to correct drift)."""
+        from services.stats_service import StatsService
+        click.echo(json.dumps(StatsService().run_recount(), indent=2, default=str))
+
+    @app.cli.command('refresh-benchmarks')
+    def refresh_benchmarks():
+        """Rebuild zip code peer benchmarks from bills (runs after each billing run)."""
+        from services.benchmark_service import BenchmarkService
+        click.echo(json.dumps(BenchmarkService().run_refresh(), indent=2, default=str))
+
+    @app.cli.command('refresh-leaderboards')
+    def refresh_leaderboards():
+        """Rebuild the top-customer leaderboards for today (run daily; reads serve the latest one)."""
+        from services.leaderboard_service import LeaderboardService
+        click.echo(json.dumps(LeaderboardService().run_refresh(), indent=2, default=str))
+
+    @app.cli.command('seed')
+    def seed():
+        """Apply schema additions missing from older databases, import seed_data/ and backfill empty rollups and benchmarks (run before starting the server)."""
+        from database import ensure_schema
+        from seed import backfill_benchmarks, backfill_rollups, run_auto_seed
+        with app.app_context():
+            ensure_schema()
+        run_auto_seed(app)
+        backfill_rollups(app)
+        backfill_benchmarks(app)
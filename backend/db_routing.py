@@ -0,0 +1,135 @@
+"""
+Read-replica routing for the Flask-SQLAlchemy session.
+
+Set DATABASE_REPLICA_URL to register a 'replica' bind. Reads inside
+use_replica() / @read_replica() go to it while its lag is within tolerance;
+everything else, and every read after the session has written, stays on the
+primary. Locally, two SQLite files (or two MySQL servers) are enough to try it.
+"""
+
+from contextlib import contextmanager
+from flask_sqlalchemy.session import Session
+from sqlalchemy import CompoundSelect, Select, text
+from cache import TTLCache
+import contextvars
+import functools
+import os
+
+REPLICA_BIND = 'replica'
+DEFAULT_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '30'))
+
+# Max acceptable lag for the current block; None means "use the primary"
+_replica_max_lag = contextvars.ContextVar('replica_max_lag', default=None)
+
+# Lag is checked at most once per interval per process
+_lag_cache = TTLCache(ttl=float(os.getenv('DB_REPLICA_LAG_CHECK_SECONDS', '5')), maxsize=16)
+_MISSING = object()
+
+
+def _mysql_lag(conn):
+    try:
+        row = conn.execute(text('SHOW REPLICA STATUS')).mappings().first()
+        column = 'Seconds_Behind_Source'
+    except Exception:
+        # MySQL before 8.0.22
+        row = conn.execute(text('SHOW SLAVE STATUS')).mappings().first()
+        column = 'Seconds_Behind_Master'
+    if row is None:
+        # Not a replica (e.g. a standalone copy for local testing): as current as it gets
+        return 0.0
+    lag = row.get(column)
+    # NULL means replication is stopped or broken
+    return float(lag) if lag is not None else None
+
+
+def replica_lag(engine):
+    """Seconds the replica is behind its source, or None if unknown"""
+    if engine.dialect.name != 'mysql':
+        return 0.0
+
+    key = str(engine.url)
+    lag = _lag_cache.get(key, _MISSING)
+    if lag is not _MISSING:
+        return lag
+    try:
+        with engine.connect() as conn:
+            lag = _mysql_lag(conn)
+    except Exception as e:
+        print(f"Replica lag check failed: {e}")
+        lag = None
+    _lag_cache.set(key, lag)
+    return lag
+
+
+def _is_read(clause):
+    return isinstance(clause, (Select, CompoundSelect)) and \
+        getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(Session):
+    """Session that sends eligible SELECTs to the replica bind"""
+
+    def _replica_engine(self, clause):
+        max_lag = _replica_max_lag.get()
+        if max_lag is None or self._flushing or self.info.get('wrote'):
+            return None
+        engine = self._db.engines.get(REPLICA_BIND)
+        if engine is None or not _is_read(clause):
+            return None
+        lag = replica_lag(engine)
+        return engine if lag is not None and lag <= max_lag else None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            engine = self._replica_engine(clause)
+            if engine is not None:
+                return engine
+            if self._flushing or (clause is not None and not _is_read(clause)):
+                # Read-your-writes: once this session writes, it reads from the primary
+                self.info['wrote'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def use_replica(max_lag=None):
+    """Route reads in this block to the replica if it is at most max_lag seconds behind"""
+    token = _replica_max_lag.set(DEFAULT_MAX_LAG_SECONDS if max_lag is None else max_lag)
+    try:
+        yield
+    finally:
+        _replica_max_lag.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Send reads in this block to the primary, even inside use_replica()"""
+    token = _replica_max_lag.set(None)
+    try:
+        yield
+    finally:
+        _replica_max_lag.reset(token)
+
+
+def read_replica(max_lag=None):
+    """Decorator form of use_replica() for read-only views and loaders"""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with use_replica(max_lag):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def replica_status(db):
+    """Whether a replica is configured and how far behind it is"""
+    engine = db.engines.get(REPLICA_BIND)
+    if engine is None:
+        return {'configured': False}
+    lag = replica_lag(engine)
+    return {
+        'configured': True,
+        'lag_seconds': lag,
+        'max_lag_seconds': DEFAULT_MAX_LAG_SECONDS,
+        'in_use': lag is not None and lag <= DEFAULT_MAX_LAG_SECONDS,
+    }
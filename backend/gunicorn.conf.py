@@ -0,0 +1,69 @@
+"""
+Gunicorn settings for serving wsgi:app. Every value can be overridden from the
+environment so docker-compose and deployments tune it without code changes.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Prefork workers, each with a small thread pool for requests that wait on MySQL
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import the app (pandas, scikit-learn, prophet...) once in the master so the
+# workers share those pages copy-on-write instead of each loading them
+reload = os.getenv('GUNICORN_RELOAD', '0') == '1'
+preload_app = not reload
+
+# Recycle workers after a jittered number of requests to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+# Imports and report generation can run long; give in-flight requests time to finish on restart
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Request-serving processes cap SELECTs (MySQL max_execution_time). Jobs run
+# through JobService and views marked @without_statement_timeout lift the cap
+# for their own statements; CLI commands keep no limit unless
+# DB_STATEMENT_TIMEOUT_MS is set for them explicitly.
+# Each worker has its own pool, so MySQL sees up to
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+os.environ.setdefault('DB_STATEMENT_TIMEOUT_MS', '30000')
+
+# The app writes its own sampled JSON access log (monitoring.py); gunicorn's
+# per-request line is off unless GUNICORN_ACCESS_LOG names a destination
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Load .env (and generate JWT_SECRET_KEY if missing) once in the master so
+    every worker inherits the same secret, even when the app is not preloaded."""
+    import app  # noqa: F401
+
+
+def post_fork(server, worker):
+    """Drop any pooled connections inherited from the master.
+
+    A connection opened while preloading would otherwise be shared by every
+    worker; close=False leaves the master's sockets alone and lets each worker
+    open its own.
+    """
+    if not preload_app:
+        return
+    from wsgi import app
+    from database import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Write any audit events still queued in this worker before it exits"""
+    from audit import audit_log
+    audit_log.close()
@@ -0,0 +1,100 @@
+"""
+HTTP caching - Response compression and conditional GET from data watermarks
+"""
+
+from authz import current_principal
+from datetime import timezone
+from flask import current_app, make_response, request
+from functools import wraps
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+# Bump when a cached endpoint's response shape changes so old ETags stop matching
+ETAG_FORMAT = 1
+
+
+def compress_response(response):
+    """after_request hook: brotli or gzip for large, complete text responses.
+
+    Streamed responses (exports, ?stream=true) are left alone so their first
+    bytes still go out immediately.
+    """
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+            or 'Content-Encoding' in response.headers \
+            or not response.mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if brotli is not None and request.accept_encodings['br']:
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match wins when present (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return last_modified is not None and since is not None and last_modified <= since
+
+
+def conditional(watermark):
+    """Answer GETs with 304 while the client's validators match watermark().
+
+    watermark() returns (version, last_modified) from cheap reads such as
+    data_versions rows, or (None, None) to serve the view uncached. The weak
+    ETag hashes that version with the path, query string and the caller's role
+    and customer, so the view and its queries only run when the data has
+    changed. Use below the authorization decorator.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            version, last_modified = watermark()
+            if version is None:  # no watermark available; serve uncached
+                return f(*args, **kwargs)
+            principal = current_principal()
+            etag = hashlib.sha1(repr((
+                ETAG_FORMAT, request.full_path, principal.role, principal.customer_id, version
+            )).encode()).hexdigest()
+            if last_modified is not None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Browsers keep the body but revalidate on every use
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
@@ -37,7 +37,8 @@ CREATE TABLE IF NOT EXISTS customers (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_location_id (location_id),
     INDEX idx_customer_type (customer_type),
-    INDEX idx_zip_code (zip_code)
+    INDEX idx_zip_code (zip_code),
+    INDEX idx_customer_name (customer_name)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Zip code based billing rates
@@ -67,6 +68,7 @@ CREATE TABLE IF NOT EXISTS water_usage (
     FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
     UNIQUE KEY unique_usage (customer_id, usage_date),
     INDEX idx_customer_date (customer_id, usage_date),
+    INDEX idx_usage_date (usage_date),
     INDEX idx_location_date (location_id, usage_date),
     INDEX idx_year_month (year, month)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -104,6 +106,7 @@ CREATE TABLE IF NOT EXISTS bills (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_bill_period (customer_id, billing_period_start, billing_period_end),
     INDEX idx_customer_status (customer_id, status),
     INDEX idx_billing_period (billing_period_start, billing_period_end),
     INDEX idx_due_date (due_date)
@@ -175,6 +178,112 @@ CREATE TABLE IF NOT EXISTS audit_log (
     INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Usage rollups (maintained incrementally on import; rebuild with `flask rebuild-rollups`)
+CREATE TABLE IF NOT EXISTS usage_monthly_rollup (
+    customer_id INT NOT NULL,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    total_usage_ccf DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    day_count INT NOT NULL DEFAULT 0,
+    max_daily_ccf DECIMAL(10, 2),
+    first_usage_date DATE,
+    last_usage_date DATE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (customer_id, year, month),
+    FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+    INDEX idx_rollup_year_month (year, month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS usage_daily_segment_rollup (
+    usage_date DATE NOT NULL,
+    zip_code VARCHAR(10) NOT NULL DEFAULT '',
+    customer_type ENUM('Residential', 'Municipal', 'Commercial') NOT NULL,
+    total_usage_ccf DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    reading_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (usage_date, zip_code, customer_type),
+    INDEX idx_zip_date (zip_code, usage_date),
+    INDEX idx_type_date (customer_type, usage_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS usage_daily_system_rollup (
+    usage_date DATE PRIMARY KEY,
+    total_usage_ccf DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    reading_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Peer benchmarks per zip x customer type x bill month (year = 0, month = 0 is all-time)
+CREATE TABLE IF NOT EXISTS peer_benchmarks (
+    zip_code VARCHAR(10) NOT NULL DEFAULT '',
+    customer_type ENUM('Residential', 'Municipal', 'Commercial') NOT NULL,
+    year INT NOT NULL DEFAULT 0,
+    month INT NOT NULL DEFAULT 0,
+    customer_count INT NOT NULL DEFAULT 0,
+    bill_count INT NOT NULL DEFAULT 0,
+    total_revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    mean_bill DECIMAL(10, 2),
+    mean_usage_ccf DECIMAL(10, 2),
+    p10_bill DECIMAL(10, 2),
+    p25_bill DECIMAL(10, 2),
+    p50_bill DECIMAL(10, 2),
+    p75_bill DECIMAL(10, 2),
+    p90_bill DECIMAL(10, 2),
+    p10_usage_ccf DECIMAL(10, 2),
+    p50_usage_ccf DECIMAL(10, 2),
+    p90_usage_ccf DECIMAL(10, 2),
+    bill_quantiles TEXT,
+    usage_quantiles TEXT,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (zip_code, customer_type, year, month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Top customers by usage for the common windows, rebuilt when stale
+CREATE TABLE IF NOT EXISTS usage_leaderboard (
+    window_key VARCHAR(20) NOT NULL,
+    customer_id INT NOT NULL,
+    rank_position INT NOT NULL,
+    total_usage_ccf DECIMAL(16, 2) NOT NULL,
+    record_count INT NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    as_of DATE NOT NULL,
+    PRIMARY KEY (window_key, customer_id),
+    FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+    INDEX idx_window_rank (window_key, rank_position)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Admin dashboard counters, maintained incrementally and recounted periodically
+CREATE TABLE IF NOT EXISTS system_stats (
+    id INT PRIMARY KEY,
+    usage_record_count BIGINT NOT NULL DEFAULT 0,
+    customer_count INT NOT NULL DEFAULT 0,
+    unique_customer_names INT NOT NULL DEFAULT 0,
+    min_usage_year INT,
+    max_usage_year INT,
+    recounted_at TIMESTAMP NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Maintenance job history (status updates, reconciliation, rebuilds)
+CREATE TABLE IF NOT EXISTS job_runs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    job_name VARCHAR(100) NOT NULL,
+    status ENUM('running', 'completed', 'failed') DEFAULT 'running',
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    duration_ms INT,
+    details TEXT,
+    INDEX idx_job_started (job_name, started_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Per-table write counters, bumped in the writing transaction (HTTP cache validators)
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- Insert default admin user (password: admin123)
 INSERT INTO users (email, password_hash, role, first_name, last_name, is_active, is_approved)
 VALUES ('admin@hydrospark.com', '$2b$12$K5iz3cTJHQFYQqP7VuGVMeZLmH7K7j8Z8f5VqB6LxR6IvJ8F1vD.e', 'admin', 'Admin', 'User', TRUE, TRUE);
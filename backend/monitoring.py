@@ -0,0 +1,370 @@
+"""
+Monitoring - Sampled structured access log and Prometheus request metrics.
+
+Every request is counted in per-route metrics served at /api/metrics. A sample
+of requests (ACCESS_LOG_SAMPLE_RATE, default 0.1), plus every 5xx and every
+request slower than ACCESS_LOG_SLOW_MS, is written as one JSON line to the
+'hydrospark.access' logger. Records go through a bounded queue to a listener
+thread, so request threads never wait on stdout; when the queue is full they
+are dropped and counted. Metrics are kept per process, so under gunicorn each
+scrape reports the worker that answered it.
+
+SQL is instrumented at the engine: each response carries its query count and
+DB time (X-DB-Queries, X-DB-Time-Ms, Server-Timing), statements slower than
+DB_SLOW_QUERY_MS go to the 'hydrospark.sql' logger with their parameters (and
+their EXPLAIN plan with DB_SLOW_QUERY_EXPLAIN=1), and a statement run
+DB_REPEAT_THRESHOLD or more times in one request is reported as a likely N+1.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from flask import Response, g, has_request_context, request
+from logging.handlers import QueueHandler, QueueListener
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import atexit
+import bisect
+import contextvars
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv('ACCESS_LOG_SAMPLE_RATE', '0.1'))
+ACCESS_LOG_SLOW_MS = float(os.getenv('ACCESS_LOG_SLOW_MS', '1000'))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv('ACCESS_LOG_QUEUE_SIZE', '10000'))
+
+# When set, /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '500'))
+DB_SLOW_QUERY_EXPLAIN = os.getenv('DB_SLOW_QUERY_EXPLAIN', '0') == '1'
+DB_REPEAT_THRESHOLD = int(os.getenv('DB_REPEAT_THRESHOLD', '10'))
+DB_STATS_HEADERS = os.getenv('DB_STATS_HEADERS', '1') == '1'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+access_logger = logging.getLogger('hydrospark.access')
+sql_logger = logging.getLogger('hydrospark.sql')
+
+# DB counters of the request being handled; None outside requests
+_db_stats = contextvars.ContextVar('db_stats', default=None)
+# Set while a slow statement is being explained, so the EXPLAIN is not measured
+_explaining = contextvars.ContextVar('explaining', default=False)
+# (route, statement) pairs already reported as repeated in this process
+_reported_repeats = set()
+
+
+def configure_logging():
+    """Plain-text application logs on stderr at LOG_LEVEL (default INFO)"""
+    logging.basicConfig(
+        level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s',
+    )
+
+
+class DBStats:
+    """Statements executed and time spent in the database during one request"""
+
+    __slots__ = ('queries', 'seconds', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements = defaultdict(int)  # SQL text -> executions
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold=DB_REPEAT_THRESHOLD):
+        """(statement, count) for SQL run at least threshold times, most repeated first"""
+        return sorted(
+            ((statement, count) for statement, count in self.statements.items() if count >= threshold),
+            key=lambda item: -item[1],
+        )
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def _explain(engine, statement, parameters):
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    token = _explaining.set(True)
+    try:
+        # A separate connection: the slow statement's cursor may still be unread
+        with engine.connect() as conn:
+            return [list(row) for row in conn.exec_driver_sql(prefix + statement, parameters)]
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        _explaining.reset(token)
+
+
+def _log_slow_query(engine, statement, parameters, executemany, seconds):
+    fields = {
+        'duration_ms': round(seconds * 1000, 2),
+        'route': _route() if has_request_context() else None,
+        'statement': statement,
+        # Keep password hashes out of the logs
+        'parameters': '<redacted>' if 'password' in statement else _truncate(repr(parameters), 2000),
+        'executemany': executemany,
+    }
+    if DB_SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip().upper().startswith('SELECT'):
+        fields['explain'] = _explain(engine, statement, parameters)
+    sql_logger.warning('Slow query: %s', json.dumps(fields, default=str))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or _explaining.get():
+        return
+    elapsed = time.perf_counter() - context._query_started
+    stats = _db_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        _log_slow_query(conn.engine, statement, parameters, executemany, elapsed)
+
+
+def _report_repeats(route, repeated):
+    """Warn once per process about each statement a route runs over and over"""
+    for statement, count in repeated:
+        if (route, statement) in _reported_repeats:
+            continue
+        _reported_repeats.add((route, statement))
+        sql_logger.warning(
+            'Statement ran %d times in one %s %s request (likely N+1): %s',
+            count, request.method, route, _truncate(statement, 500),
+        )
+
+
+class RequestMetrics:
+    """Per-route request counters, latency histograms and DB totals"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)  # (method, route, status) -> count
+        self._latency = {}  # (method, route) -> per-bucket counts, then +Inf, then sum
+        self._db = defaultdict(lambda: [0, 0.0])  # (method, route) -> [queries, seconds]
+
+    def observe(self, method, route, status, seconds, db_stats):
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        key = (method, route)
+        with self._lock:
+            self._requests[(method, route, status)] += 1
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[bucket] += 1
+            histogram[-1] += seconds
+            db = self._db[key]
+            db[0] += db_stats.queries
+            db[1] += db_stats.seconds
+
+    def render(self, extra=()):
+        """Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((key, list(values)) for key, values in self._latency.items())
+            db = sorted((key, list(values)) for key, values in self._db.items())
+
+        lines = [
+            '# HELP hydrospark_http_requests_total Requests handled, by route and status.',
+            '# TYPE hydrospark_http_requests_total counter',
+        ]
+        for (method, route, status), count in requests:
+            lines.append(f'hydrospark_http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        lines += [
+            '# HELP hydrospark_http_request_duration_seconds Time from routing to response, by route.',
+            '# TYPE hydrospark_http_request_duration_seconds histogram',
+        ]
+        for (method, route), values in latency:
+            cumulative = 0
+            for le, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(
+                    f'hydrospark_http_request_duration_seconds_bucket'
+                    f'{_labels(method=method, route=route, le=le)} {cumulative}'
+                )
+            labels = _labels(method=method, route=route)
+            lines.append(f'hydrospark_http_request_duration_seconds_sum{labels} {values[-1]:.6f}')
+            lines.append(f'hydrospark_http_request_duration_seconds_count{labels} {cumulative}')
+
+        lines += [
+            '# HELP hydrospark_db_queries_total SQL statements executed while handling requests, by route.',
+            '# TYPE hydrospark_db_queries_total counter',
+        ]
+        lines += [f'hydrospark_db_queries_total{_labels(method=m, route=r)} {q}' for (m, r), (q, _) in db]
+        lines += [
+            '# HELP hydrospark_db_seconds_total Time spent executing SQL while handling requests, by route.',
+            '# TYPE hydrospark_db_seconds_total counter',
+        ]
+        lines += [f'hydrospark_db_seconds_total{_labels(method=m, route=r)} {s:.6f}' for (m, r), (_, s) in db]
+
+        for name, kind, help_text, value in extra:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Hands records to the listener thread as-is; drops them when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Fields are serialized by the listener, off the request thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _JSONLineFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, default=str, separators=(',', ':'))
+
+
+class AccessLog:
+    """Asynchronous JSON-lines access log on stdout.
+
+    The listener thread is started lazily in the process that writes, so a
+    gunicorn master that preloads the app does not hand workers a dead thread.
+    """
+
+    def __init__(self, maxsize=ACCESS_LOG_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._pid = None
+        self._lock = threading.Lock()
+        self._handler = None
+
+    def _start(self):
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(_JSONLineFormatter())
+        self._handler = _DroppingQueueHandler(queue.Queue(self.maxsize))
+        listener = QueueListener(self._handler.queue, output)
+        listener.start()
+        atexit.register(listener.stop)
+
+        access_logger.handlers = [self._handler]
+        access_logger.setLevel(logging.INFO)
+        access_logger.propagate = False
+        self._pid = os.getpid()
+
+    def write(self, fields):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        access_logger.info(fields)
+
+    @property
+    def dropped(self):
+        return self._handler.dropped if self._handler is not None and self._pid == os.getpid() else 0
+
+
+metrics = RequestMetrics()
+access_log = AccessLog()
+
+
+def _route():
+    # The URL rule, not the path, keeps label and log cardinality bounded
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.db_stats = DBStats()
+    _db_stats.set(g.db_stats)
+
+
+def _finish_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    stats = g.db_stats
+    route = _route()
+    metrics.observe(request.method, route, response.status_code, elapsed, stats)
+    repeated = stats.repeated()
+    if repeated:
+        _report_repeats(route, repeated)
+
+    if DB_STATS_HEADERS:
+        response.headers['X-DB-Queries'] = str(stats.queries)
+        response.headers['X-DB-Time-Ms'] = f'{stats.seconds * 1000:.1f}'
+        response.headers['Server-Timing'] = f'db;dur={stats.seconds * 1000:.1f}, app;dur={elapsed * 1000:.1f}'
+
+    if response.status_code >= 500 or elapsed * 1000 >= ACCESS_LOG_SLOW_MS \
+            or random.random() < ACCESS_LOG_SAMPLE_RATE:
+        principal = g.get('principal')
+        access_log.write({
+            'ts': datetime.utcnow().isoformat(timespec='milliseconds') + 'Z',
+            'method': request.method,
+            'route': route,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_ms': round(stats.seconds * 1000, 2),
+            'queries': stats.queries,
+            'repeated_statements': len(repeated),
+            'bytes': response.content_length,
+            'user_id': principal.user_id if principal is not None else None,
+            'remote_addr': request.remote_addr,
+        })
+    return response
+
+
+def _end_request(exc):
+    _db_stats.set(None)
+
+
+def metrics_endpoint():
+    """Request metrics in Prometheus text format"""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    body = metrics.render(extra=[
+        ('hydrospark_access_log_dropped_total', 'counter',
+         'Access log records dropped because the queue was full.', access_log.dropped),
+    ])
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def init_monitoring(app):
+    """Time every request, feed the metrics and access log, and serve /api/metrics.
+
+    Register before other after_request hooks (such as compression) so the
+    logged size is what was actually sent.
+    """
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    app.add_url_rule('/api/metrics', view_func=metrics_endpoint, methods=['GET'])
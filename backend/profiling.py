@@ -0,0 +1,197 @@
+"""
+Profiling - On-demand cProfile runs of individual requests.
+
+A request is profiled when a staff user sends "X-Profile: 1", or when it is
+picked by PROFILE_SAMPLE_RATE (default 0) among requests under
+PROFILE_SAMPLE_PREFIX (default /api/admin/). The profile is saved as a pstats
+file in PROFILE_DIR, which all gunicorn workers share, and the response names
+it in X-Profile-Id. The oldest profiles are deleted once the directory holds
+more than PROFILE_MAX_FILES files or PROFILE_MAX_BYTES bytes. Admins list and
+download them from /api/admin/profiles.
+
+When neither the header nor sampling applies, the only cost is a header lookup.
+"""
+
+from authz import current_principal, is_staff
+from datetime import datetime
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SAMPLE_PREFIX = os.getenv('PROFILE_SAMPLE_PREFIX', '/api/admin/')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'hydrospark-profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+PROFILE_MAX_BYTES = int(os.getenv('PROFILE_MAX_BYTES', str(100 * 1024 * 1024)))
+
+# Timestamp first, so ids sort oldest to newest
+PROFILE_ID_PATTERN = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileStore:
+    """pstats files plus a small JSON description of each, bounded in count and bytes"""
+
+    def __init__(self, directory=PROFILE_DIR, max_files=PROFILE_MAX_FILES, max_bytes=PROFILE_MAX_BYTES):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, profile_id):
+        """Path of a stored pstats file, or None for an unknown or malformed id"""
+        if not PROFILE_ID_PATTERN.match(profile_id or ''):
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.pstats')
+        return path if os.path.exists(path) else None
+
+    def save(self, profiler, meta):
+        """Write the profile and its description; returns the new profile id"""
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id)
+        profiler.dump_stats(f'{base}.pstats')
+        meta = dict(meta, id=profile_id, size_bytes=os.path.getsize(f'{base}.pstats'))
+        with open(f'{base}.json', 'w') as f:
+            json.dump(meta, f)
+        self._evict()
+        return profile_id
+
+    def _entries(self):
+        """(profile_id, pstats bytes), oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in sorted(names):
+            profile_id, ext = os.path.splitext(name)
+            if ext == '.pstats' and PROFILE_ID_PATTERN.match(profile_id):
+                try:
+                    entries.append((profile_id, os.path.getsize(os.path.join(self.directory, name))))
+                except FileNotFoundError:  # evicted by another worker
+                    pass
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size in entries)
+            while entries and (len(entries) > self.max_files or total > self.max_bytes):
+                profile_id, size = entries.pop(0)
+                total -= size
+                self.delete(profile_id)
+
+    def delete(self, profile_id):
+        for ext in ('.pstats', '.json'):
+            try:
+                os.remove(os.path.join(self.directory, f'{profile_id}{ext}'))
+            except FileNotFoundError:
+                pass
+
+    def list(self):
+        """Descriptions of stored profiles, newest first"""
+        profiles = []
+        for profile_id, _ in reversed(self._entries()):
+            try:
+                with open(os.path.join(self.directory, f'{profile_id}.json')) as f:
+                    profiles.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                pass
+        return profiles
+
+    def summary(self, profile_id, sort='cumulative', limit=50):
+        """pstats' text report of the top functions, or None if the profile is gone"""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+profile_store = ProfileStore()
+
+
+def _requested_by_staff():
+    try:
+        verify_jwt_in_request()
+        principal = current_principal()
+    except Exception:
+        return False
+    return principal is not None and principal.is_active and is_staff(principal)
+
+
+def _should_profile():
+    if request.headers.get(PROFILE_HEADER) == '1':
+        return _requested_by_staff()
+    return PROFILE_SAMPLE_RATE > 0 and request.path.startswith(PROFILE_SAMPLE_PREFIX) \
+        and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _start_profile():
+    if PROFILE_SAMPLE_RATE <= 0 and PROFILE_HEADER not in request.headers:
+        return
+    if not _should_profile():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler is already active in this thread
+        return
+    g.profiler = profiler
+    g.profile_started = time.perf_counter()
+
+
+def _stop_profile():
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+    return profiler
+
+
+def _finish_profile(response):
+    profiler = _stop_profile()
+    if profiler is None:
+        return response
+    try:
+        principal = g.get('principal')
+        profile_id = profile_store.save(profiler, {
+            'created_at': datetime.utcnow().isoformat(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'route': request.url_rule.rule if request.url_rule is not None else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - g.profile_started) * 1000, 2),
+            'trigger': 'header' if request.headers.get(PROFILE_HEADER) == '1' else 'sample',
+            'user_id': principal.user_id if principal is not None else None,
+        })
+        response.headers['X-Profile-Id'] = profile_id
+    except Exception:
+        logger.exception("Saving profile failed")
+    return response
+
+
+def _end_profile(exc):
+    # after_request does not run if the request failed before a response existed
+    _stop_profile()
+
+
+def init_profiling(app):
+    """Register the profiling hooks; call after other before_request hooks so they are not profiled"""
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_end_profile)
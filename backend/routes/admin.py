@@ -3,27 +3,28 @@ Admin routes - User management, data import
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db, User, Customer, AuditLog, Bill, ZipCodeRate, WaterUsage
+from authz import admin_required, invalidate_principal
+from database import db, data_versions, without_statement_timeout, User, Customer, AuditLog, Bill, ZipCodeRate
+from db_routing import read_replica
+from http_caching import conditional
+from serialization import bill_serializer
 from services.data_import_service import DataImportService
+from services.usage_summary_service import invalidate_all_summaries, invalidate_customer_summaries
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import case, func, or_
 import bcrypt
+import logging
+import os
 
 admin_bp = Blueprint('admin', __name__)
+logger = logging.getLogger(__name__)
 import_service = DataImportService()
 
 @admin_bp.route('/users', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_users():
     """Get all users"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         users = User.query.all()
         return jsonify({
             'users': [u.to_dict() for u in users]
@@ -32,22 +33,17 @@ def get_users():
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/users/<int:user_id>/approve', methods=['POST'])
-@jwt_required()
+@admin_required
 def approve_user(user_id):
     """Approve pending user"""
     try:
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
-        
-        if not current_user or current_user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         user = User.query.get(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         user.is_approved = True
         db.session.commit()
+        invalidate_principal(user.id)
         
         return jsonify({
             'message': 'User approved',
@@ -58,16 +54,10 @@ def approve_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/users', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_user():
     """Create new user (admin only)"""
     try:
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
-        
-        if not current_user or current_user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         
         if User.query.filter_by(email=data['email']).first():
@@ -97,6 +87,9 @@ def create_user():
                 customer_type=data.get('customer_type', 'Residential')
             )
             db.session.add(customer)
+            db.session.flush()
+            from services.stats_service import StatsService
+            StatsService().record_customer(customer)
         
         db.session.commit()
         
@@ -109,57 +102,132 @@ def create_user():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+BILL_STATUSES = ['pending', 'sent', 'paid', 'overdue']
+CHARGES_SORT_COLUMNS = ['customer_name', 'email', 'customer_type', 'zip_code', 'bill_count', 'total_amount']
+
+
+def _charges_watermark():
+    return data_versions('bills', 'customers', 'users')
+
+
 @admin_bp.route('/charges', methods=['GET'])
-@jwt_required()
+@admin_required
+@read_replica()
+@conditional(_charges_watermark)
 def get_charges_by_user():
-    """Get all bills grouped by customer/user"""
+    """
+    Bill totals per customer, one row per customer from a single aggregate query.
+    Query params: search (name or email), sort (customer_name, email, customer_type,
+    zip_code, bill_count, total_amount), order (asc, desc), page, per_page.
+    Bills for one customer are fetched separately from /charges/<customer_id>/bills.
+    """
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
+        sort = request.args.get('sort', 'customer_name')
+        order = request.args.get('order', 'asc')
+        if sort not in CHARGES_SORT_COLUMNS:
+            return jsonify({'error': f"sort must be one of: {', '.join(CHARGES_SORT_COLUMNS)}"}), 400
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': 'order must be asc or desc'}), 400
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+        search = (request.args.get('search') or '').strip()
+
+        totals = db.session.query(
+            Bill.customer_id,
+            func.count(Bill.id).label('bill_count'),
+            func.sum(Bill.total_amount).label('total_amount'),
+            *[
+                func.sum(case((Bill.status == status, 1), else_=0)).label(f'{status}_count')
+                for status in BILL_STATUSES
+            ]
+        ).group_by(Bill.customer_id).subquery()
+
+        columns = {
+            'customer_name': Customer.customer_name,
+            'email': User.email,
+            'customer_type': Customer.customer_type,
+            'zip_code': Customer.zip_code,
+            'bill_count': func.coalesce(totals.c.bill_count, 0),
+            'total_amount': func.coalesce(totals.c.total_amount, 0),
+        }
+
+        query = db.session.query(
+            Customer.id,
+            Customer.customer_name,
+            Customer.customer_type,
+            Customer.location_id,
+            Customer.zip_code,
+            Customer.custom_rate_per_ccf,
+            User.email,
+            columns['bill_count'].label('bill_count'),
+            columns['total_amount'].label('total_amount'),
+            *[totals.c[f'{status}_count'] for status in BILL_STATUSES]
+        ).outerjoin(User, User.id == Customer.user_id
+        ).outerjoin(totals, totals.c.customer_id == Customer.id)
+
+        if search:
+            pattern = f'%{search}%'
+            query = query.filter(or_(Customer.customer_name.ilike(pattern), User.email.ilike(pattern)))
+
+        total = query.order_by(None).count()
+
+        sort_column = columns[sort]
+        query = query.order_by(
+            sort_column.desc() if order == 'desc' else sort_column.asc(),
+            Customer.id
+        )
+        rows = query.offset((page - 1) * per_page).limit(per_page).all()
 
-        customers = Customer.query.all()
         result = []
-        for customer in customers:
-            bills = Bill.query.filter_by(customer_id=customer.id).order_by(Bill.billing_period_end.desc()).all()
-            total_amount = sum(float(b.total_amount) for b in bills)
-            status_counts = {}
-            for b in bills:
-                status_counts[b.status] = status_counts.get(b.status, 0) + 1
-
-            email = customer.user.email if customer.user else None
-
+        for r in rows:
             result.append({
-                'customer_id': customer.id,
-                'customer_name': customer.customer_name,
-                'email': email,
-                'customer_type': customer.customer_type,
-                'location_id': customer.location_id,
-                'bill_count': len(bills),
-                'total_amount': round(total_amount, 2),
-                'status_counts': status_counts,
-                'bills': [b.to_dict() for b in bills],
+                'customer_id': r.id,
+                'customer_name': r.customer_name,
+                'email': r.email,
+                'customer_type': r.customer_type,
+                'location_id': r.location_id,
+                'zip_code': r.zip_code,
+                'custom_rate_per_ccf': float(r.custom_rate_per_ccf) if r.custom_rate_per_ccf is not None else None,
+                'bill_count': int(r.bill_count),
+                'total_amount': round(float(r.total_amount), 2),
+                'status_counts': {
+                    status: int(getattr(r, f'{status}_count'))
+                    for status in BILL_STATUSES if getattr(r, f'{status}_count')
+                },
             })
 
-        result.sort(key=lambda c: c['customer_name'] or '')
+        return jsonify({
+            'customers': result,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({'customers': result}), 200
+
+@admin_bp.route('/charges/<int:customer_id>/bills', methods=['GET'])
+@admin_required
+@read_replica()
+@conditional(_charges_watermark)
+def get_customer_charges(customer_id):
+    """Bills for one customer, newest period first"""
+    try:
+        rows = db.session.query(*bill_serializer.columns).filter(
+            Bill.customer_id == customer_id
+        ).order_by(Bill.billing_period_end.desc()).all()
+        return jsonify({'customer_id': customer_id, 'bills': bill_serializer.dicts(rows)}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @admin_bp.route('/customers/<int:customer_id>/rate', methods=['PUT'])
-@jwt_required()
+@admin_required
 def set_customer_rate(customer_id):
     """Set or clear a per-customer CCF rate override"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
         customer = Customer.query.get(customer_id)
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
@@ -171,9 +239,15 @@ def set_customer_rate(customer_id):
         if rate is not None:
             customer.custom_rate_per_ccf = float(rate) if rate != '' else None
         if zip_code is not None:
+            old_zip = customer.zip_code
             customer.zip_code = zip_code.strip() if zip_code else None
+            from services.rollup_service import RollupService
+            RollupService().move_customer_segment(
+                customer.id, old_zip, customer.customer_type, customer.zip_code, customer.customer_type
+            )
 
         db.session.commit()
+        invalidate_customer_summaries([customer.id])
         return jsonify({'message': 'Customer rate updated', 'customer': customer.to_dict()}), 200
     except Exception as e:
         db.session.rollback()
@@ -181,15 +255,10 @@ def set_customer_rate(customer_id):
 
 
 @admin_bp.route('/zip-rates', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_zip_rates():
     """Get all zip code rates"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
         rates = ZipCodeRate.query.order_by(ZipCodeRate.zip_code).all()
         return jsonify({'zip_rates': [r.to_dict() for r in rates]}), 200
     except Exception as e:
@@ -197,15 +266,10 @@ def get_zip_rates():
 
 
 @admin_bp.route('/zip-rates', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_zip_rate():
     """Create a zip code rate"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
         data = request.get_json()
         if ZipCodeRate.query.filter_by(zip_code=data['zip_code']).first():
             return jsonify({'error': 'Rate for this zip code already exists'}), 400
@@ -218,6 +282,7 @@ def create_zip_rate():
         )
         db.session.add(rate)
         db.session.commit()
+        invalidate_all_summaries()
         return jsonify({'message': 'Zip code rate created', 'zip_rate': rate.to_dict()}), 201
     except Exception as e:
         db.session.rollback()
@@ -225,15 +290,10 @@ def create_zip_rate():
 
 
 @admin_bp.route('/zip-rates/<int:rate_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_zip_rate(rate_id):
     """Update a zip code rate"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
         rate = ZipCodeRate.query.get(rate_id)
         if not rate:
             return jsonify({'error': 'Zip code rate not found'}), 404
@@ -247,6 +307,7 @@ def update_zip_rate(rate_id):
             rate.is_active = bool(data['is_active'])
 
         db.session.commit()
+        invalidate_all_summaries()
         return jsonify({'message': 'Zip code rate updated', 'zip_rate': rate.to_dict()}), 200
     except Exception as e:
         db.session.rollback()
@@ -254,21 +315,17 @@ def update_zip_rate(rate_id):
 
 
 @admin_bp.route('/zip-rates/<int:rate_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_zip_rate(rate_id):
     """Delete a zip code rate"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
         rate = ZipCodeRate.query.get(rate_id)
         if not rate:
             return jsonify({'error': 'Zip code rate not found'}), 404
 
         db.session.delete(rate)
         db.session.commit()
+        invalidate_all_summaries()
         return jsonify({'message': 'Zip code rate deleted'}), 200
     except Exception as e:
         db.session.rollback()
@@ -276,33 +333,16 @@ def delete_zip_rate(rate_id):
 
 
 @admin_bp.route('/zip-analytics', methods=['GET'])
-@jwt_required()
+@admin_required
+@read_replica()
 def get_zip_analytics():
     """
     Return billing and usage stats grouped by zip code and customer type (admin only).
-    Used for the admin zip code analytics dashboard.
+    Used for the admin zip code analytics dashboard; reads the precomputed peer benchmarks.
     """
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
-        rows = (
-            db.session.query(
-                Customer.zip_code,
-                Customer.customer_type,
-                func.count(func.distinct(Customer.id)).label('customer_count'),
-                func.avg(Bill.total_amount).label('avg_monthly_bill'),
-                func.avg(Bill.total_usage_ccf).label('avg_monthly_usage_ccf'),
-                func.sum(Bill.total_amount).label('total_revenue'),
-            )
-            .join(Bill, Bill.customer_id == Customer.id)
-            .filter(Customer.zip_code.isnot(None))
-            .group_by(Customer.zip_code, Customer.customer_type)
-            .order_by(Customer.zip_code, Customer.customer_type)
-            .all()
-        )
+        from services.benchmark_service import BenchmarkService
+        rows = BenchmarkService().all_time_benchmarks()
 
         # Group by zip code so the response is [{zip_code, types: [...]}, ...]
         zip_map = {}
@@ -310,12 +350,15 @@ def get_zip_analytics():
             zc = r.zip_code
             if zc not in zip_map:
                 zip_map[zc] = {'zip_code': zc, 'types': []}
+            d = r.to_dict()
             zip_map[zc]['types'].append({
-                'customer_type': r.customer_type,
-                'customer_count': int(r.customer_count),
-                'avg_monthly_bill': round(float(r.avg_monthly_bill), 2),
-                'avg_monthly_usage_ccf': round(float(r.avg_monthly_usage_ccf), 2),
-                'total_revenue': round(float(r.total_revenue), 2),
+                'customer_type': d['customer_type'],
+                'customer_count': d['customer_count'],
+                'avg_monthly_bill': d['avg_monthly_bill'],
+                'avg_monthly_usage_ccf': d['avg_monthly_usage_ccf'],
+                'total_revenue': d['total_revenue'],
+                'bill_percentiles': d['bill_percentiles'],
+                'usage_percentiles': d['usage_percentiles'],
             })
 
         return jsonify({'zip_analytics': list(zip_map.values())}), 200
@@ -325,16 +368,11 @@ def get_zip_analytics():
 
 
 @admin_bp.route('/detect', methods=['POST'])
-@jwt_required()
+@admin_required
+@without_statement_timeout
 def detect_anomalies():
     """Run anomaly detection for all customers (admin only)"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
         from services.ml_service import MLService
         ml_service = MLService()
 
@@ -350,31 +388,16 @@ def detect_anomalies():
         }), 200
 
     except Exception as e:
-        print(f"Anomaly detection error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Anomaly detection failed")
         return jsonify({'error': str(e)}), 500
 
 
 @admin_bp.route('/import/usage', methods=['POST'])
-@jwt_required()
+@admin_required
+@without_statement_timeout
 def import_usage_data():
     """Import usage data from CSV/XLSX"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        print(f"User ID: {user_id}")
-        print(f"User: {user}")
-        print(f"User role: {user.role if user else 'None'}")
-        
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        print(f"Request files: {request.files}")
-        print(f"Request form: {request.form}")
-        print(f"Request content type: {request.content_type}")
-        
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded'}), 400
         
@@ -383,67 +406,166 @@ def import_usage_data():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        print(f"Starting import of file: {file.filename}")
+        logger.info("Starting import of file %s", file.filename)
         result = import_service.import_usage_data(file)
-        print(f"Import completed: {result}")
+        logger.info("Import of %s completed: %s", file.filename, result)
         
         return jsonify(result), 200
         
     except Exception as e:
-        print(f"Import error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Import failed")
         return jsonify({'error': str(e)}), 500
     
 @admin_bp.route('/generate-historical-bills', methods=['POST'])
-@jwt_required()
+@admin_required
+@without_statement_timeout
 def generate_historical_bills():
     """Generate historical bills for all customers (admin only)"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         from services.billing_service import BillingService
         billing_service = BillingService()
         
-        print("Starting historical bill generation...")
+        logger.info("Starting historical bill generation")
         result = billing_service.generate_historical_bills()
-        print(f"Bill generation completed: {result}")
+        logger.info("Historical bill generation completed: %s", result)
         
         return jsonify(result), 200
         
     except Exception as e:
-        print(f"Historical bill generation error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Historical bill generation failed")
         return jsonify({'error': str(e)}), 500
 
 
 @admin_bp.route('/stats', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_stats():
     """Return high-level system stats for the admin dashboard."""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
+        from services.stats_service import StatsService
+        return jsonify(StatsService().get_stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        record_count = db.session.query(func.count(WaterUsage.id)).scalar() or 0
-        customer_count = db.session.query(func.count(Customer.id)).scalar() or 0
-        unique_name_count = db.session.query(func.count(func.distinct(Customer.customer_name))).scalar() or 0
-        min_year = db.session.query(func.min(WaterUsage.year)).scalar()
-        max_year = db.session.query(func.max(WaterUsage.year)).scalar()
+@admin_bp.route('/db/pool', methods=['GET'])
+@admin_required
+def get_pool_stats():
+    """Connection pool usage for this worker process."""
+    try:
+        from database import pool_stats
+        from db_routing import REPLICA_BIND, replica_status
+        result = {'pid': os.getpid(), 'pool': pool_stats(), 'replica': replica_status(db)}
+        if REPLICA_BIND in db.engines:
+            result['replica_pool'] = pool_stats(db.engines[REPLICA_BIND])
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({
-            'record_count': record_count,
-            'customer_count': customer_count,
-            'unique_customer_names': unique_name_count,
-            'min_year': min_year,
-            'max_year': max_year,
-        }), 200
+@admin_bp.route('/profiles', methods=['GET'])
+@admin_required
+def get_profiles():
+    """Stored request profiles, newest first (send X-Profile: 1 to record one)"""
+    try:
+        from profiling import profile_store
+        return jsonify({'profiles': profile_store.list()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def download_profile(profile_id):
+    """Download a profile as a pstats file, or ?format=text for the top functions
+    (?sort=cumulative|tottime|calls, ?limit=50)"""
+    try:
+        from flask import Response, send_file
+        from profiling import profile_store
+        path = profile_store.path(profile_id)
+        if path is None:
+            return jsonify({'error': 'Profile not found'}), 404
+
+        if request.args.get('format') == 'text':
+            sort = request.args.get('sort', 'cumulative')
+            if sort not in ('cumulative', 'tottime', 'calls'):
+                return jsonify({'error': 'sort must be one of: cumulative, tottime, calls'}), 400
+            summary = profile_store.summary(profile_id, sort, request.args.get('limit', 50, type=int))
+            return Response(summary, mimetype='text/plain')
+
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{profile_id}.pstats')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/stats/recount', methods=['POST'])
+@admin_required
+def recount_stats():
+    """Recount the dashboard counters exactly and report any drift."""
+    try:
+        from services.stats_service import StatsService
+        return jsonify(StatsService().run_recount()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/benchmarks/refresh', methods=['POST'])
+@admin_required
+def refresh_benchmarks():
+    """Rebuild the zip code peer benchmarks from bills."""
+    try:
+        from services.benchmark_service import BenchmarkService
+        return jsonify(BenchmarkService().run_refresh()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/jobs', methods=['GET'])
+@admin_required
+def get_job_runs():
+    """Return recent maintenance job runs with their counts and timings."""
+    try:
+        from services.job_service import JobService
+        runs = JobService().recent_runs(
+            job_name=request.args.get('job_name'),
+            limit=request.args.get('limit', 50, type=int)
+        )
+        return jsonify({'job_runs': [r.to_dict() for r in runs]}), 200
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_bp.route('/jobs/bill-status', methods=['POST'])
+@admin_required
+def run_bill_status_job():
+    """Run the bill status maintenance job (admin only)"""
+    try:
+        from services.bill_status_service import BillStatusService
+        result = BillStatusService().run()
+
+        if 'error' in result:
+            return jsonify(result), 500
+
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_bp.route('/reconcile', methods=['POST'])
+@admin_required
+def reconcile_bills():
+    """Reconcile bills against usage and effective rates, optionally re-billing (admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+
+        from services.reconciliation_service import ReconciliationService
+        result = ReconciliationService().run(
+            start_date=datetime.fromisoformat(start_date).date() if start_date else None,
+            end_date=datetime.fromisoformat(end_date).date() if end_date else None,
+            rebill=bool(data.get('rebill', False))
+        )
+
+        if 'error' in result:
+            return jsonify(result), 500
+
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -3,58 +3,56 @@ Anomaly detection and alerts routes
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db, User, Customer, AnomalyAlert
+from authz import admin_required, current_principal, login_required
+from database import db, Customer, AnomalyAlert, User
+from serialization import alert_serializer
 from services.ml_service import MLService
 from datetime import datetime
 
 alerts_bp = Blueprint('alerts', __name__)
 ml_service = MLService()
 
+ALERT_LIST_SERIALIZER = alert_serializer.extend(
+    customer_name=Customer.customer_name.label('customer_name'),
+    customer_email=User.email.label('customer_email'),
+)
+
 @alerts_bp.route('/', methods=['GET'])
-@jwt_required()
+@login_required
 def get_alerts():
     """Get anomaly alerts"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
-        if user.role == 'customer':
-            if not user.customer:
+        if principal.role == 'customer':
+            if not principal.customer_id:
                 return jsonify({'error': 'Customer profile not found'}), 404
-            customer_id = user.customer.id
+            customer_id = principal.customer_id
         else:
             customer_id = request.args.get('customer_id', type=int)
         
-        query = AnomalyAlert.query
+        # Customer name and email come from the same query instead of lazy loads per alert
+        query = db.session.query(*ALERT_LIST_SERIALIZER.columns).outerjoin(
+            Customer, Customer.id == AnomalyAlert.customer_id
+        ).outerjoin(User, User.id == Customer.user_id)
         if customer_id:
-            query = query.filter_by(customer_id=customer_id)
+            query = query.filter(AnomalyAlert.customer_id == customer_id)
 
         status = request.args.get('status')
         if status:
-            query = query.filter_by(status=status)
-
-        alerts = query.order_by(AnomalyAlert.alert_date.desc()).all()
+            query = query.filter(AnomalyAlert.status == status)
 
-        def alert_dict(alert):
-            d = alert.to_dict()
-            if alert.customer:
-                d['customer_name'] = alert.customer.customer_name
-                d['customer_email'] = alert.customer.user.email if alert.customer.user else None
-            else:
-                d['customer_name'] = None
-                d['customer_email'] = None
-            return d
+        rows = query.order_by(AnomalyAlert.alert_date.desc()).all()
 
         return jsonify({
-            'alerts': [alert_dict(a) for a in alerts]
+            'alerts': ALERT_LIST_SERIALIZER.dicts(rows)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @alerts_bp.route('/<int:alert_id>/acknowledge', methods=['POST'])
-@jwt_required()
+@login_required
 def acknowledge_alert(alert_id):
     """Acknowledge an alert"""
     try:
@@ -75,16 +73,10 @@ def acknowledge_alert(alert_id):
         return jsonify({'error': str(e)}), 500
 
 @alerts_bp.route('/detect', methods=['POST'])
-@jwt_required()
+@admin_required
 def detect_anomalies():
     """Run anomaly detection (admin only)"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         customer_id = data.get('customer_id')
         
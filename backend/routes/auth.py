@@ -3,8 +3,11 @@ Authentication routes - Login, Register, Token Management
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from database import db, User, Customer, AuditLog
+from flask_jwt_extended import create_access_token, get_jwt_identity
+from audit import audit_log
+from authz import login_required, token_claims
+from database import db, User, Customer
+from services.stats_service import StatsService
 #import bcrypt
 from datetime import datetime
 
@@ -33,18 +36,12 @@ def login():
         if user.role == 'customer' and not user.is_approved:
             return jsonify({'error': 'Account pending approval'}), 401
         
-        # Create access token with STRING user ID
-        access_token = create_access_token(identity=str(user.id))
+        # STRING user ID; role and customer id ride along as claims for authz
+        access_token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
         
-        # Log the login
-        audit = AuditLog(
-            user_id=user.id,
-            action='login',
-            details=f'User {email} logged in',
-            ip_address=request.remote_addr
-        )
-        db.session.add(audit)
-        db.session.commit()
+        # Log the login (queued; written in the background)
+        audit_log.record('login', user_id=user.id, details=f'User {email} logged in',
+                         ip_address=request.remote_addr)
         
         # Get customer info if customer role
         customer_info = None
@@ -105,18 +102,15 @@ def register():
             facility_name=data.get('facility_name')
         )
         db.session.add(customer)
-        
-        # Log registration
-        audit = AuditLog(
-            user_id=user.id,
-            action='register',
-            details=f'New customer registration: {data["email"]}',
-            ip_address=request.remote_addr
-        )
-        db.session.add(audit)
+        db.session.flush()
+        StatsService().record_customer(customer)
         
         db.session.commit()
         
+        # Log registration once the user row exists
+        audit_log.record('register', user_id=user.id, details=f'New customer registration: {data["email"]}',
+                         ip_address=request.remote_addr)
+        
         return jsonify({
             'message': 'Registration successful. Please wait for admin approval.',
             'user': user.to_dict()
@@ -127,7 +121,7 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/me', methods=['GET'])
-@jwt_required()
+@login_required
 def get_current_user():
     """Get current user information"""
     try:
@@ -150,7 +144,7 @@ def get_current_user():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/change-password', methods=['POST'])
-@jwt_required()
+@login_required
 def change_password():
     """Change user password"""
     try:
@@ -175,16 +169,12 @@ def change_password():
         #user.password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         user.updated_at = datetime.utcnow()
         
-        # Log password change
-        audit = AuditLog(
-            user_id=user.id,
-            action='change_password',
-            details='Password changed',
-            ip_address=request.remote_addr
-        )
-        db.session.add(audit)
         db.session.commit()
         
+        # Log password change
+        audit_log.record('change_password', user_id=user.id, details='Password changed',
+                         ip_address=request.remote_addr)
+        
         return jsonify({'message': 'Password changed successfully'}), 200
         
     except Exception as e:
@@ -3,57 +3,56 @@ Billing routes
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db, User, Customer, Bill, WaterUsage, BillingRate
+from authz import admin_required, current_principal, login_required
+from database import db, Customer, Bill, WaterUsage, BillingRate
+from serialization import bill_serializer
 from datetime import datetime, timedelta
 from sqlalchemy import func
 
 billing_bp = Blueprint('billing', __name__)
 
 @billing_bp.route('/bills', methods=['GET'])
-@jwt_required()
+@login_required
 def get_bills():
     """Get bills for customer"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
-        if user.role == 'customer':
-            if not user.customer:
+        if principal.role == 'customer':
+            if not principal.customer_id:
                 return jsonify({'error': 'Customer profile not found'}), 404
-            customer_id = user.customer.id
+            customer_id = principal.customer_id
         else:
             customer_id = request.args.get('customer_id', type=int)
         
-        query = Bill.query
+        query = db.session.query(*bill_serializer.columns)
         if customer_id:
-            query = query.filter_by(customer_id=customer_id)
+            query = query.filter(Bill.customer_id == customer_id)
         
         today = datetime.now().date()
-        bills = query.filter(Bill.billing_period_end <= today).order_by(Bill.billing_period_end.desc()).all()
+        rows = query.filter(Bill.billing_period_end <= today).order_by(Bill.billing_period_end.desc()).all()
         
         return jsonify({
-            'bills': [b.to_dict() for b in bills]
+            'bills': bill_serializer.dicts(rows)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @billing_bp.route('/bills/<int:bill_id>', methods=['GET'])
-@jwt_required()
+@login_required
 def get_bill(bill_id):
     """Get specific bill"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
         bill = Bill.query.get(bill_id)
         if not bill:
             return jsonify({'error': 'Bill not found'}), 404
         
         # Check permissions
-        if user.role == 'customer':
-            if not user.customer or bill.customer_id != user.customer.id:
+        if principal.role == 'customer':
+            if not principal.customer_id or bill.customer_id != principal.customer_id:
                 return jsonify({'error': 'Access denied'}), 403
         
         return jsonify({'bill': bill.to_dict()}), 200
@@ -62,16 +61,10 @@ def get_bill(bill_id):
         return jsonify({'error': str(e)}), 500
 
 @billing_bp.route('/generate', methods=['POST'])
-@jwt_required()
+@admin_required
 def generate_bill():
     """Generate bill for customer (admin/billing only)"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         customer_id = data.get('customer_id')
         start_date = datetime.fromisoformat(data.get('start_date'))
@@ -99,19 +92,35 @@ def generate_bill():
         
         # Calculate total amount
         total_amount = float(total_usage) * float(rate.flat_rate)
-        
-        # Create bill
-        bill = Bill(
+
+        # A paid bill is final; upsert_bills would leave it unchanged anyway
+        paid = Bill.query.filter_by(
             customer_id=customer_id,
             billing_period_start=start_date.date(),
             billing_period_end=end_date.date(),
-            total_usage_ccf=total_usage,
-            total_amount=total_amount,
-            due_date=(end_date + timedelta(days=15)).date(),
-            status='pending'
-        )
-        db.session.add(bill)
+            status='paid'
+        ).first()
+        if paid:
+            return jsonify({'error': 'A paid bill already exists for this period', 'bill': paid.to_dict()}), 409
+        
+        # Create or refresh the bill for this period
+        from services.billing_service import BillingService
+        BillingService().upsert_bills([{
+            'customer_id': customer_id,
+            'billing_period_start': start_date.date(),
+            'billing_period_end': end_date.date(),
+            'total_usage_ccf': float(total_usage),
+            'total_amount': total_amount,
+            'due_date': (end_date + timedelta(days=15)).date(),
+            'status': 'pending'
+        }], refresh=True)
         db.session.commit()
+
+        bill = Bill.query.filter_by(
+            customer_id=customer_id,
+            billing_period_start=start_date.date(),
+            billing_period_end=end_date.date()
+        ).first()
         
         return jsonify({
             'message': 'Bill generated successfully',
@@ -121,3 +130,34 @@ def generate_bill():
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@billing_bp.route('/simulate', methods=['POST'])
+@admin_required
+def simulate_rates():
+    """Project revenue under a candidate rate table without writing bills (admin/billing only)"""
+    try:
+        data = request.get_json() or {}
+        if not data.get('start_date') or not data.get('end_date'):
+            return jsonify({'error': 'start_date and end_date are required'}), 400
+
+        try:
+            start_date = datetime.fromisoformat(data.get('start_date')).date()
+            end_date = datetime.fromisoformat(data.get('end_date')).date()
+        except (TypeError, ValueError):
+            return jsonify({'error': 'start_date and end_date must be YYYY-MM-DD'}), 400
+
+        from services.rate_simulation_service import RateSimulationService
+        result = RateSimulationService().simulate(
+            data.get('rates'),
+            start_date,
+            end_date,
+            keep_custom_rates=data.get('keep_custom_rates', True)
+        )
+
+        if 'error' in result:
+            return jsonify(result), 400
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
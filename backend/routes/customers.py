@@ -3,32 +3,19 @@ Customer management routes
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db, User, Customer
-from functools import wraps
+from authz import current_principal, login_required
+from database import db, Customer
 
 customers_bp = Blueprint('customers', __name__)
 
-def admin_required(f):
-    @wraps(f)
-    @jwt_required()
-    def decorated_function(*args, **kwargs):
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-        return f(*args, **kwargs)
-    return decorated_function
-
 @customers_bp.route('/', methods=['GET'])
-@jwt_required()
+@login_required
 def get_customers():
     """Get all customers (admin) or current customer info"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
-        if user.role in ['admin', 'billing']:
+        if principal.role in ['admin', 'billing']:
             # Admin/billing can see all customers
             customers = Customer.query.all()
             return jsonify({
@@ -36,9 +23,10 @@ def get_customers():
             }), 200
         else:
             # Customer can only see their own info
-            if user.customer:
+            customer = Customer.query.get(principal.customer_id) if principal.customer_id else None
+            if customer:
                 return jsonify({
-                    'customer': user.customer.to_dict()
+                    'customer': customer.to_dict()
                 }), 200
             return jsonify({'error': 'Customer profile not found'}), 404
             
@@ -46,19 +34,18 @@ def get_customers():
         return jsonify({'error': str(e)}), 500
 
 @customers_bp.route('/<int:customer_id>', methods=['GET'])
-@jwt_required()
+@login_required
 def get_customer(customer_id):
     """Get specific customer by ID"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
         customer = Customer.query.get(customer_id)
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
         
         # Check permissions
-        if user.role == 'customer' and customer.user_id != user_id:
+        if principal.role == 'customer' and customer.id != principal.customer_id:
             return jsonify({'error': 'Access denied'}), 403
         
         return jsonify({'customer': customer.to_dict()}), 200
@@ -67,31 +54,39 @@ def get_customer(customer_id):
         return jsonify({'error': str(e)}), 500
 
 @customers_bp.route('/<int:customer_id>', methods=['PUT'])
-@jwt_required()
+@login_required
 def update_customer(customer_id):
     """Update customer information"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
         customer = Customer.query.get(customer_id)
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
         
         # Check permissions
-        if user.role == 'customer' and customer.user_id != user_id:
+        if principal.role == 'customer' and customer.id != principal.customer_id:
             return jsonify({'error': 'Access denied'}), 403
         
         data = request.get_json()
         
         # Update fields
         if 'customer_name' in data:
+            old_name = customer.customer_name
             customer.customer_name = data['customer_name']
+            db.session.flush()
+            from services.stats_service import StatsService
+            StatsService().record_rename(customer.id, old_name, customer.customer_name)
         if 'mailing_address' in data:
             customer.mailing_address = data['mailing_address']
-        if 'customer_type' in data and user.role in ['admin', 'billing']:
+        if 'customer_type' in data and principal.role in ['admin', 'billing']:
+            old_type = customer.customer_type
             customer.customer_type = data['customer_type']
-        if 'cycle_number' in data and user.role in ['admin', 'billing']:
+            from services.rollup_service import RollupService
+            RollupService().move_customer_segment(
+                customer.id, customer.zip_code, old_type, customer.zip_code, customer.customer_type
+            )
+        if 'cycle_number' in data and principal.role in ['admin', 'billing']:
             customer.cycle_number = data['cycle_number']
         if 'business_name' in data:
             customer.business_name = data['business_name']
@@ -99,6 +94,9 @@ def update_customer(customer_id):
             customer.facility_name = data['facility_name']
         
         db.session.commit()
+        if 'customer_type' in data and principal.role in ['admin', 'billing']:
+            from services.usage_summary_service import invalidate_customer_summaries
+            invalidate_customer_summaries([customer.id])
         
         return jsonify({
             'message': 'Customer updated successfully',
@@ -0,0 +1,57 @@
+"""
+Customer dashboard bundle route
+"""
+
+from flask import Blueprint, request, jsonify
+from authz import current_principal, login_required
+from database import db, Customer
+from services.dashboard_service import DashboardService
+from datetime import datetime
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+
+@dashboard_bp.route('/', methods=['GET'])
+@login_required
+def get_dashboard():
+    """
+    All customer dashboard data in one response.
+    Query params: sections (comma separated: user, customer, summary, usage, bills,
+    alerts, forecasts, peers; default all), fields[<section>] (comma separated keys
+    to keep), start_date/end_date for summary and usage (default last 30 days).
+    Staff pass customer_id to view a customer's dashboard.
+    """
+    try:
+        principal = current_principal()
+        user_id = principal.user_id
+
+        customer_id = request.args.get('customer_id', type=int)
+        if customer_id:
+            if principal.role not in ['admin', 'billing']:
+                return jsonify({'error': 'Access denied'}), 403
+            user_id = db.session.query(Customer.user_id).filter(Customer.id == customer_id).scalar()
+            if not user_id:
+                return jsonify({'error': 'Customer not found'}), 404
+
+        sections = request.args.get('sections')
+        fields = {
+            key[len('fields['):-1]: [f.strip() for f in value.split(',') if f.strip()]
+            for key, value in request.args.items()
+            if key.startswith('fields[') and key.endswith(']')
+        }
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        payload, error = DashboardService().bundle(
+            user_id,
+            sections=[s.strip() for s in sections.split(',') if s.strip()] if sections else None,
+            fields=fields,
+            start_date=datetime.fromisoformat(start_date).date() if start_date else None,
+            end_date=datetime.fromisoformat(end_date).date() if end_date else None
+        )
+        if error:
+            return jsonify({'error': error}), 404 if error.endswith('not found') else 400
+        return jsonify(payload), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,55 @@
+"""
+Bulk export routes (admin/billing only)
+"""
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from authz import admin_required
+from services.export_service import ExportService, FORMATS
+from datetime import datetime
+
+exports_bp = Blueprint('exports', __name__)
+
+
+@exports_bp.route('/<dataset>', methods=['GET'])
+@admin_required
+def export_dataset(dataset):
+    """
+    Stream water_usage, bills or anomaly_alerts as CSV or NDJSON.
+    Query params: format (csv, ndjson), start_date, end_date, zip_code,
+    customer_type, customer_id, status (bills and anomaly_alerts only).
+    """
+    try:
+        fmt = request.args.get('format', 'csv')
+        if fmt not in FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        filters = {
+            'start_date': datetime.fromisoformat(start_date).date() if start_date else None,
+            'end_date': datetime.fromisoformat(end_date).date() if end_date else None,
+            'zip_code': request.args.get('zip_code'),
+            'customer_type': request.args.get('customer_type'),
+            'customer_id': request.args.get('customer_id', type=int),
+            'status': request.args.get('status'),
+        }
+
+        export_service = ExportService()
+        stmt, error = export_service.build_query(dataset, filters)
+        if error:
+            return jsonify({'error': error}), 400
+
+        filename = f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+        return Response(
+            stream_with_context(export_service.stream(stmt, fmt)),
+            mimetype=FORMATS[fmt],
+            headers={
+                'Content-Disposition': f'attachment; filename={filename}',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -3,28 +3,30 @@ Usage forecasting routes
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db, User, Customer, UsageForecast
+from authz import admin_required, current_principal, login_required
+from database import db, data_versions, Customer, UsageForecast
+from http_caching import conditional
 from services.ml_service import MLService
 from datetime import datetime
+import logging
 
 forecasts_bp = Blueprint('forecasts', __name__)
+logger = logging.getLogger(__name__)
 ml_service = MLService()
 
 @forecasts_bp.route('/generate', methods=['POST'])
-@jwt_required()
+@login_required
 def generate_forecast():
     """Generate usage forecast for customer"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
         data = request.get_json() or {}
         
-        if user.role == 'customer':
-            if not user.customer:
+        if principal.role == 'customer':
+            if not principal.customer_id:
                 return jsonify({'error': 'Customer profile not found'}), 404
-            customer_id = user.customer.id
+            customer_id = principal.customer_id
         else:
             customer_id = data.get('customer_id')
             if not customer_id:
@@ -32,12 +34,12 @@ def generate_forecast():
         
         months = data.get('months', 12)
         
-        print(f"Generating forecast for customer {customer_id}, months: {months}")
+        logger.info("Generating %s-month forecast for customer %s", months, customer_id)
         
         # Generate forecast
         forecasts = ml_service.generate_forecast(customer_id, months)
         
-        print(f"Forecast result: {forecasts}")
+        logger.debug("Forecast result: %s", forecasts)
         
         if isinstance(forecasts, dict) and 'error' in forecasts:
             return jsonify(forecasts), 400
@@ -50,22 +52,14 @@ def generate_forecast():
         }), 200
         
     except Exception as e:
-        print(f"Forecast generation error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Forecast generation failed")
         return jsonify({'error': str(e)}), 500
 
 @forecasts_bp.route('/generate-system', methods=['POST'])
-@jwt_required()
+@admin_required
 def generate_system_forecast():
     """Generate system-wide forecast aggregating all customers (admin/billing only)"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-
-        if user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
-
         data = request.get_json() or {}
         months = data.get('months', 12)
 
@@ -82,24 +76,25 @@ def generate_system_forecast():
         }), 200
 
     except Exception as e:
-        print(f"System forecast error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("System forecast failed")
         return jsonify({'error': str(e)}), 500
 
 
+def _forecasts_watermark():
+    return data_versions('usage_forecasts')
+
 @forecasts_bp.route('/', methods=['GET'])
-@jwt_required()
+@login_required
+@conditional(_forecasts_watermark)
 def get_forecasts():
     """Get existing forecasts"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
-        if user.role == 'customer':
-            if not user.customer:
+        if principal.role == 'customer':
+            if not principal.customer_id:
                 return jsonify({'error': 'Customer profile not found'}), 404
-            customer_id = user.customer.id
+            customer_id = principal.customer_id
         else:
             customer_id = request.args.get('customer_id', type=int)
         
@@ -3,8 +3,8 @@ Meter reading OCR routes
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db, User, Customer, MeterReading
+from authz import current_principal, login_required
+from database import db, Customer, MeterReading
 from services.ocr_service import OCRService
 import os
 from werkzeug.utils import secure_filename
@@ -19,14 +19,13 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @meter_bp.route('/upload', methods=['POST'])
-@jwt_required()
+@login_required
 def upload_meter_photo():
     """Upload meter photo and extract reading"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
-        if user.role != 'customer' or not user.customer:
+        if principal.role != 'customer' or not principal.customer_id:
             return jsonify({'error': 'Customer access required'}), 403
         
         if 'photo' not in request.files:
@@ -40,7 +39,7 @@ def upload_meter_photo():
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{user.customer.id}_{timestamp}_{filename}"
+            filename = f"{principal.customer_id}_{timestamp}_{filename}"
             
             os.makedirs(UPLOAD_FOLDER, exist_ok=True)
             filepath = os.path.join(UPLOAD_FOLDER, filename)
@@ -51,7 +50,7 @@ def upload_meter_photo():
             
             # Save reading
             meter_reading = MeterReading(
-                customer_id=user.customer.id,
+                customer_id=principal.customer_id,
                 image_path=filepath,
                 reading_value=reading_value,
                 ocr_confidence=confidence,
@@ -64,7 +63,7 @@ def upload_meter_photo():
             from services.billing_service import BillingService
             billing_service = BillingService()
             estimated_bill = billing_service.estimate_bill_from_reading(
-                user.customer.id,
+                principal.customer_id,
                 reading_value
             )
             
@@ -81,17 +80,16 @@ def upload_meter_photo():
         return jsonify({'error': str(e)}), 500
 
 @meter_bp.route('/readings', methods=['GET'])
-@jwt_required()
+@login_required
 def get_meter_readings():
     """Get meter readings"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
         
-        if user.role == 'customer':
-            if not user.customer:
+        if principal.role == 'customer':
+            if not principal.customer_id:
                 return jsonify({'error': 'Customer profile not found'}), 404
-            customer_id = user.customer.id
+            customer_id = principal.customer_id
         else:
             customer_id = request.args.get('customer_id', type=int)
         
@@ -2,75 +2,154 @@
 Water usage data routes
 """
 
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db, User, Customer, WaterUsage, Bill
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from authz import admin_required, current_principal, login_required
+from database import db, data_versions, User, Customer, WaterUsage
+from db_routing import read_replica
+from http_caching import conditional
+from serialization import usage_serializer
+from services.rollup_service import RollupService
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import tuple_
 
 usage_bp = Blueprint('usage', __name__)
 
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 5000
+
+# Staff listings also carry the customer's name and email
+STAFF_USAGE_SERIALIZER = usage_serializer.extend(
+    customer_name=Customer.customer_name.label('customer_name'),
+    customer_email=User.email.label('customer_email'),
+)
+
+
+def _encode_cursor(row):
+    return f"{row.usage_date.isoformat()}:{row.id}"
+
+
+def _decode_cursor(cursor):
+    """Parse a 'YYYY-MM-DD:id' cursor into (usage_date, id); None if malformed"""
+    try:
+        usage_date, row_id = cursor.split(':')
+        return datetime.fromisoformat(usage_date).date(), int(row_id)
+    except (ValueError, AttributeError):
+        return None
+
+
+def _usage_page(query, after, limit):
+    """One keyset page, newest first, resuming strictly after the (usage_date, id) cursor"""
+    if after:
+        query = query.filter(tuple_(WaterUsage.usage_date, WaterUsage.id) < after)
+    return query.order_by(WaterUsage.usage_date.desc(), WaterUsage.id.desc()).limit(limit).all()
+
+
+def _usage_watermark():
+    """A customer's own rollup version; staff listings also depend on names and emails"""
+    principal = current_principal()
+    if principal.role == 'customer':
+        return RollupService().customer_version(principal.customer_id)
+    return data_versions('water_usage', 'customers', 'users')
+
+
 @usage_bp.route('/', methods=['GET'])
-@jwt_required()
+@login_required
+@conditional(_usage_watermark)
 def get_usage():
-    """Get water usage data with filters"""
+    """Get water usage data with filters.
+
+    Pages are keyset-paginated on (usage_date, id), newest first: pass the
+    returned next_cursor as ?cursor= to fetch the next page. With ?stream=true
+    every matching row is streamed in one response instead.
+    """
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
 
         # Get query parameters
         customer_id = request.args.get('customer_id', type=int)
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-
-        query = WaterUsage.query
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        stream = request.args.get('stream', 'false').lower() == 'true'
+
+        after = None
+        if request.args.get('cursor'):
+            after = _decode_cursor(request.args.get('cursor'))
+            if not after:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+        if principal.role in ['admin', 'billing']:
+            serializer = STAFF_USAGE_SERIALIZER
+            query = db.session.query(*serializer.columns).outerjoin(
+                Customer, Customer.id == WaterUsage.customer_id
+            ).outerjoin(User, User.id == Customer.user_id)
+        else:
+            serializer = usage_serializer
+            query = db.session.query(*serializer.columns)
 
         # Apply customer filter based on role
-        if user.role == 'customer':
-            if not user.customer:
+        if principal.role == 'customer':
+            if not principal.customer_id:
                 return jsonify({'error': 'Customer profile not found'}), 404
-            query = query.filter_by(customer_id=user.customer.id)
+            query = query.filter(WaterUsage.customer_id == principal.customer_id)
         elif customer_id:
-            query = query.filter_by(customer_id=customer_id)
+            query = query.filter(WaterUsage.customer_id == customer_id)
 
         # Apply date filters
         if start_date:
-            query = query.filter(WaterUsage.usage_date >= datetime.fromisoformat(start_date))
+            query = query.filter(WaterUsage.usage_date >= datetime.fromisoformat(start_date).date())
         if end_date:
-            query = query.filter(WaterUsage.usage_date <= datetime.fromisoformat(end_date))
+            query = query.filter(WaterUsage.usage_date <= datetime.fromisoformat(end_date).date())
 
-        # Order by date
-        usage_data = query.order_by(WaterUsage.usage_date.desc()).limit(1000).all()
+        if stream:
+            return Response(
+                stream_with_context(_stream_usage(query, after, serializer)),
+                mimetype='application/json'
+            )
 
-        if user.role in ['admin', 'billing']:
-            def record_with_customer(u):
-                d = u.to_dict()
-                if u.customer:
-                    d['customer_name'] = u.customer.customer_name
-                    d['customer_email'] = u.customer.user.email if u.customer.user else None
-                return d
-            return jsonify({'usage': [record_with_customer(u) for u in usage_data], 'count': len(usage_data)}), 200
+        rows = _usage_page(query, after, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
         return jsonify({
-            'usage': [u.to_dict() for u in usage_data],
-            'count': len(usage_data)
+            'usage': serializer.dicts(rows),
+            'count': len(rows),
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(rows[-1]) if has_more else None
         }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+def _stream_usage(query, after, serializer):
+    """Stream {"usage": [...], "count": n} while walking keyset batches"""
+    yield '{"usage": ['
+    count = 0
+    while True:
+        rows = _usage_page(query, after, STREAM_BATCH_SIZE)
+        if not rows:
+            break
+        # Encode the batch as one array and drop its brackets
+        yield (',' if count else '') + current_app.json.dumps(serializer.dicts(rows))[1:-1]
+        count += len(rows)
+        after = (rows[-1].usage_date, rows[-1].id)
+        if len(rows) < STREAM_BATCH_SIZE:
+            break
+    yield f'], "count": {count}}}'
+
 @usage_bp.route('/summary', methods=['GET'])
-@jwt_required()
+@login_required
 def get_usage_summary():
     """Get usage summary statistics"""
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
 
-        if user.role == 'customer':
-            if not user.customer:
+        if principal.role == 'customer':
+            if not principal.customer_id:
                 return jsonify({'error': 'Customer profile not found'}), 404
-            customer_id = user.customer.id
+            customer_id = principal.customer_id
         else:
             customer_id = request.args.get('customer_id', type=int)
             if not customer_id:
@@ -85,149 +164,176 @@ def get_usage_summary():
         if request.args.get('end_date'):
             end_date = datetime.fromisoformat(request.args.get('end_date')).date()
 
-        total_usage = db.session.query(func.sum(WaterUsage.daily_usage_ccf)).filter(
-            WaterUsage.customer_id == customer_id,
-            WaterUsage.usage_date >= start_date,
-            WaterUsage.usage_date <= end_date
-        ).scalar() or 0
-
-        avg_daily = db.session.query(func.avg(WaterUsage.daily_usage_ccf)).filter(
-            WaterUsage.customer_id == customer_id,
-            WaterUsage.usage_date >= start_date,
-            WaterUsage.usage_date <= end_date
-        ).scalar() or 0
-
-        max_daily = db.session.query(func.max(WaterUsage.daily_usage_ccf)).filter(
-            WaterUsage.customer_id == customer_id,
-            WaterUsage.usage_date >= start_date,
-            WaterUsage.usage_date <= end_date
-        ).scalar() or 0
-
-        # Include rate and estimated cost for customers
-        rate_per_ccf = None
-        estimated_cost = None
-        customer_obj = Customer.query.get(customer_id)
-        if customer_obj:
-            from services.billing_service import BillingService
-            bs = BillingService()
-            rate_per_ccf = bs._resolve_rate(customer_obj)
-            estimated_cost = float(total_usage) * rate_per_ccf
+        from services.usage_summary_service import UsageSummaryService
+        customer = Customer.query.get(customer_id)
+        if not customer:
+            # Staff asking about an unknown customer get an empty summary, as before
+            return jsonify(UsageSummaryService().empty_summary(start_date, end_date)), 200
 
-        return jsonify({
-            'period': {
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat()
-            },
-            'summary': {
-                'total_usage_ccf': float(total_usage),
-                'average_daily_ccf': float(avg_daily),
-                'max_daily_ccf': float(max_daily),
-                'days_count': (end_date - start_date).days + 1,
-                'rate_per_ccf': rate_per_ccf,
-                'estimated_cost': estimated_cost
-            }
-        }), 200
+        return jsonify(UsageSummaryService().summarize(customer, start_date, end_date)), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@usage_bp.route('/top-customers', methods=['GET'])
-@jwt_required()
-def get_top_customers():
-    """Get top customers by usage for a period (admin only)"""
+@usage_bp.route('/series', methods=['GET'])
+@login_required
+@read_replica()
+def get_usage_series():
+    """
+    Usage time series resampled server-side for charts.
+    Query params: scope (customer, zip_code, customer_type, system), the matching
+    customer_id / zip_code / customer_type, start_date, end_date,
+    resolution (day, week, month) or points (LTTB point budget).
+    Customers always get their own series.
+    """
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
 
-        if not user or user.role not in ['admin', 'billing']:
-            return jsonify({'error': 'Admin access required'}), 403
+        scope = request.args.get('scope', 'customer')
+        if principal.role == 'customer':
+            if not principal.customer_id:
+                return jsonify({'error': 'Customer profile not found'}), 404
+            scope, value = 'customer', principal.customer_id
+        elif scope == 'customer':
+            value = request.args.get('customer_id', type=int)
+        else:
+            value = request.args.get(scope)
 
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-        limit = request.args.get('limit', 15, type=int)
 
-        query = db.session.query(
-            WaterUsage.customer_id,
-            func.sum(WaterUsage.daily_usage_ccf).label('total_usage'),
-            func.count(WaterUsage.id).label('record_count')
+        from services.series_service import SeriesService
+        result = SeriesService().series(
+            scope,
+            value,
+            start_date=datetime.fromisoformat(start_date).date() if start_date else None,
+            end_date=datetime.fromisoformat(end_date).date() if end_date else None,
+            resolution=request.args.get('resolution', 'day'),
+            points=request.args.get('points', type=int)
         )
 
-        if start_date:
-            query = query.filter(WaterUsage.usage_date >= start_date)
-        if end_date:
-            query = query.filter(WaterUsage.usage_date <= end_date)
+        if 'error' in result:
+            return jsonify(result), 400
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@usage_bp.route('/top-customers', methods=['GET'])
+@admin_required
+@read_replica()
+def get_top_customers():
+    """
+    Get top customers by usage for a period (admin only).
+    Query params: window (this_month, last_7_days, last_30_days, last_90_days,
+    last_365_days, this_year) or start_date/end_date, and limit.
+    """
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        window = request.args.get('window')
+        limit = request.args.get('limit', 15, type=int)
 
-        results = query.group_by(WaterUsage.customer_id).order_by(
-            func.sum(WaterUsage.daily_usage_ccf).desc()
-        ).limit(limit).all()
+        from services.leaderboard_service import LeaderboardService, WINDOWS
+        if window and window not in WINDOWS:
+            return jsonify({'error': f"window must be one of: {', '.join(WINDOWS)}"}), 400
+
+        leaderboard_service = LeaderboardService()
+        results, origin = leaderboard_service.top_customers(
+            window_key=window,
+            start_date=datetime.fromisoformat(start_date).date() if start_date else None,
+            end_date=datetime.fromisoformat(end_date).date() if end_date else None,
+            limit=limit
+        )
+        customers = leaderboard_service.customer_details([row.customer_id for row in results])
 
         output = []
         for row in results:
-            customer = Customer.query.get(row.customer_id)
+            customer = customers.get(row.customer_id)
             output.append({
                 'customer_id': row.customer_id,
                 'customer_name': customer.customer_name if customer else f'Customer {row.customer_id}',
-                'customer_email': customer.user.email if customer and customer.user else None,
+                'customer_email': customer.email if customer else None,
                 'customer_type': customer.customer_type if customer else None,
                 'total_usage_ccf': float(row.total_usage),
                 'record_count': int(row.record_count)
             })
 
-        return jsonify({'top_customers': output}), 200
+        # A leaderboard snapshot may predate today; as_of and the dates say which
+        return jsonify({
+            'top_customers': output,
+            'source': origin['source'],
+            'as_of': origin['as_of'].isoformat(),
+            'start_date': origin['start_date'].isoformat() if origin['start_date'] else None,
+            'end_date': origin['end_date'].isoformat() if origin['end_date'] else None,
+        }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @usage_bp.route('/zip-averages', methods=['GET'])
-@jwt_required()
+@login_required
 def get_zip_averages():
     """
     Return average monthly bill and usage per customer type for a given zip code.
     Customers use this to compare their usage against others in their area.
-    Query param: zip_code (optional — defaults to the calling customer's zip code).
+    Query params: zip_code (optional — defaults to the calling customer's zip code),
+    year and month (optional, together — a single bill month instead of all time).
+    Customers also get the percentile their own bills fall in.
     """
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        principal = current_principal()
+        customer = Customer.query.get(principal.customer_id) \
+            if principal.role == 'customer' and principal.customer_id else None
 
         zip_code = request.args.get('zip_code')
 
         # Customers default to their own zip code
-        if not zip_code and user.role == 'customer':
-            if not user.customer or not user.customer.zip_code:
+        if not zip_code and principal.role == 'customer':
+            if not customer or not customer.zip_code:
                 return jsonify({'zip_code': None, 'averages': []}), 200
-            zip_code = user.customer.zip_code
+            zip_code = customer.zip_code
 
         if not zip_code:
             return jsonify({'error': 'zip_code is required'}), 400
 
-        # Average monthly bill and usage per customer type in this zip code
-        rows = (
-            db.session.query(
-                Customer.customer_type,
-                func.avg(Bill.total_amount).label('avg_monthly_bill'),
-                func.avg(Bill.total_usage_ccf).label('avg_monthly_usage_ccf'),
-                func.count(func.distinct(Customer.id)).label('customer_count'),
-            )
-            .join(Bill, Bill.customer_id == Customer.id)
-            .filter(Customer.zip_code == zip_code)
-            .group_by(Customer.customer_type)
-            .all()
-        )
+        year = request.args.get('year', type=int)
+        month = request.args.get('month', type=int)
+        if (year is None) != (month is None):
+            return jsonify({'error': 'year and month must be given together'}), 400
+        if month is not None and not 1 <= month <= 12:
+            return jsonify({'error': 'month must be between 1 and 12'}), 400
+
+        # Precomputed per zip x customer type (x month), refreshed after billing runs
+        from services.benchmark_service import BenchmarkService
+        benchmark_service = BenchmarkService()
+        benchmarks = benchmark_service.zip_benchmarks(zip_code, year, month)
+
+        averages = []
+        your_position = None
+        for b in benchmarks:
+            d = b.to_dict()
+            averages.append({
+                'customer_type': d['customer_type'],
+                'avg_monthly_bill': d['avg_monthly_bill'],
+                'avg_monthly_usage_ccf': d['avg_monthly_usage_ccf'],
+                'customer_count': d['customer_count'],
+                'bill_percentiles': d['bill_percentiles'],
+                'usage_percentiles': d['usage_percentiles'],
+            })
+            if customer and customer.zip_code == zip_code and customer.customer_type == b.customer_type:
+                your_position = benchmark_service.customer_position(customer, b, year, month)
 
-        averages = [
-            {
-                'customer_type': r.customer_type,
-                'avg_monthly_bill': round(float(r.avg_monthly_bill), 2),
-                'avg_monthly_usage_ccf': round(float(r.avg_monthly_usage_ccf), 2),
-                'customer_count': int(r.customer_count),
-            }
-            for r in rows
-        ]
-
-        return jsonify({'zip_code': zip_code, 'averages': averages}), 200
+        return jsonify({
+            'zip_code': zip_code,
+            'year': year,
+            'month': month,
+            'averages': averages,
+            'your_position': your_position
+        }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
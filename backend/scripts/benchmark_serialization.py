@@ -0,0 +1,106 @@
+"""
+Serialization benchmark - ORM + to_dict + stdlib JSON against column tuples + orjson.
+
+For the usage, bills and alerts listings, loads the same rows both ways,
+checks that the JSON bodies decode to identical data and reports the time
+spent loading and encoding each. Run from backend/ against any database
+with data:
+
+    python scripts/benchmark_serialization.py --limit 10000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from database import db, AnomalyAlert, Bill, Customer, User, WaterUsage  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from serialization import FastJSONProvider, alert_serializer, bill_serializer, usage_serializer  # noqa: E402
+
+
+def _alert_to_dict(alert):
+    # What GET /api/alerts returned before the serialization layer
+    d = alert.to_dict()
+    d['customer_name'] = alert.customer.customer_name if alert.customer else None
+    d['customer_email'] = alert.customer.user.email if alert.customer and alert.customer.user else None
+    return d
+
+
+def _cases(limit):
+    alert_list = alert_serializer.extend(customer_name=Customer.customer_name, customer_email=User.email)
+    return {
+        'usage': (
+            lambda: [u.to_dict() for u in WaterUsage.query.order_by(WaterUsage.id).limit(limit).all()],
+            lambda: usage_serializer.dicts(
+                db.session.query(*usage_serializer.columns).order_by(WaterUsage.id).limit(limit).all()
+            ),
+        ),
+        'bills': (
+            lambda: [b.to_dict() for b in Bill.query.order_by(Bill.id).limit(limit).all()],
+            lambda: bill_serializer.dicts(
+                db.session.query(*bill_serializer.columns).order_by(Bill.id).limit(limit).all()
+            ),
+        ),
+        'alerts': (
+            lambda: [_alert_to_dict(a) for a in AnomalyAlert.query.order_by(AnomalyAlert.id).limit(limit).all()],
+            lambda: alert_list.dicts(
+                db.session.query(*alert_list.columns)
+                .outerjoin(Customer, Customer.id == AnomalyAlert.customer_id)
+                .outerjoin(User, User.id == Customer.user_id)
+                .order_by(AnomalyAlert.id).limit(limit).all()
+            ),
+        ),
+    }
+
+
+def _time(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limit', type=int, default=10000, help='Rows per listing')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (median reported)')
+    args = parser.parse_args()
+
+    app = create_app()
+    stdlib_json = DefaultJSONProvider(app)
+    fast_json = FastJSONProvider(app)
+
+    report = {}
+    with app.app_context():
+        for name, (orm_load, tuple_load) in _cases(args.limit).items():
+            old_rows, old_load_ms = _time(orm_load, args.repeat)
+            new_rows, new_load_ms = _time(tuple_load, args.repeat)
+            old_body, old_encode_ms = _time(lambda: stdlib_json.dumps({name: old_rows}, separators=(',', ':')), args.repeat)
+            new_body, new_encode_ms = _time(lambda: fast_json.dumps({name: new_rows}), args.repeat)
+
+            report[name] = {
+                'rows': len(new_rows),
+                'identical': json.loads(old_body) == json.loads(new_body),
+                'identical_bytes': old_body == new_body,
+                'orm_to_dict_ms': round(old_load_ms, 1),
+                'column_tuples_ms': round(new_load_ms, 1),
+                'stdlib_json_ms': round(old_encode_ms, 1),
+                'fast_json_ms': round(new_encode_ms, 1),
+                'speedup': round((old_load_ms + old_encode_ms) / max(new_load_ms + new_encode_ms, 1e-9), 2),
+            }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
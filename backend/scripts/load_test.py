@@ -0,0 +1,126 @@
+"""
+Load test - Concurrent requests against a running API, reporting throughput and latency.
+
+Compare the dev server with gunicorn on the same data:
+
+    python app.py                                    # single process
+    python scripts/load_test.py --url http://localhost:5000
+
+    gunicorn -c gunicorn.conf.py wsgi:app            # prefork workers
+    python scripts/load_test.py --url http://localhost:5000
+
+Only the standard library is used, so it runs from any machine that can
+reach the API.
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = [
+    '/api/health',
+    '/api/usage/summary',
+    '/api/usage/?limit=100',
+    '/api/billing/bills',
+    '/api/dashboard/',
+]
+
+
+def login(base_url, email, password):
+    body = json.dumps({'email': email, 'password': password}).encode()
+    request = urllib.request.Request(
+        f'{base_url}/api/auth/login', data=body, headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())['access_token']
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = {}
+
+    def record(self, latency, error=None):
+        with self.lock:
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            else:
+                self.latencies.append(latency)
+
+
+def worker(base_url, paths, headers, deadline, results, offset):
+    i = offset
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            request = urllib.request.Request(f'{base_url}{path}', headers=headers)
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+            results.record(time.perf_counter() - started)
+        except urllib.error.HTTPError as e:
+            results.record(None, f'HTTP {e.code} {path}')
+        except Exception as e:
+            results.record(None, type(e).__name__)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5001', help='API base URL')
+    parser.add_argument('--email', default=None, help='Log in as this user (omit to test /api/health only)')
+    parser.add_argument('--password', default=None)
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    headers = {}
+    paths = args.paths or (DEFAULT_PATHS if args.email else ['/api/health'])
+    if args.email:
+        headers['Authorization'] = f'Bearer {login(base_url, args.email, args.password)}'
+
+    results = Results()
+    started = time.monotonic()
+    deadline = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for n in range(args.concurrency):
+            pool.submit(worker, base_url, paths, headers, deadline, results, n)
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(results.latencies)
+    errors = sum(results.errors.values())
+    print(json.dumps({
+        'url': base_url,
+        'paths': paths,
+        'concurrency': args.concurrency,
+        'duration_seconds': round(elapsed, 1),
+        'requests': len(latencies) + errors,
+        'errors': results.errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
 """
 Auto-seed: imports water usage data from seed_data/ if the database is empty.
 Place your CSV or XLSX data file in backend/seed_data/ before first run.
-The backend will auto-import it on startup when the water_usage table is empty.
+Run with `flask --app app seed`; docker-compose does this before starting
+the server, and it is a no-op once water_usage has rows.
+
+It also backfills the usage rollups and peer benchmarks when the data was
+loaded some other way (the hydrospark_data.sql.gz snapshot, a mysqldump
+restore), since only the import path and billing runs maintain them.
 """
 
 import os
@@ -71,3 +76,39 @@ def run_auto_seed(app):
                 f"{result.get('imported_records', 0)} records, "
                 f"{result.get('customers_created', 0)} customers created."
             )
+
+
+def backfill_rollups(app):
+    """Rebuild the usage rollups if water_usage has rows but the rollups are empty."""
+    with app.app_context():
+        from database import db, WaterUsage, UsageMonthlyRollup
+        if db.session.query(UsageMonthlyRollup.customer_id).first() is not None:
+            return
+        if db.session.query(WaterUsage.id).first() is None:
+            return
+
+        print("[seed] Usage rollups are empty — rebuilding them from water_usage.")
+        from services.rollup_service import RollupService
+        result = RollupService().run_rebuild()
+        if 'error' in result:
+            print(f"[seed] Rollup rebuild failed: {result['error']}")
+        else:
+            print(f"[seed] Rollups rebuilt — {result.get('months_rebuilt', 0)} months.")
+
+
+def backfill_benchmarks(app):
+    """Build the zip code peer benchmarks if bills exist but the benchmarks are empty."""
+    with app.app_context():
+        from database import db, Bill, PeerBenchmark
+        if db.session.query(PeerBenchmark.zip_code).first() is not None:
+            return
+        if db.session.query(Bill.id).first() is None:
+            return
+
+        print("[seed] Peer benchmarks are empty — building them from bills.")
+        from services.benchmark_service import BenchmarkService
+        result = BenchmarkService().run_refresh()
+        if 'error' in result:
+            print(f"[seed] Benchmark refresh failed: {result['error']}")
+        else:
+            print(f"[seed] Benchmarks built — {result.get('benchmark_rows', 0)} rows.")
@@ -0,0 +1,120 @@
+"""
+Serialization - Column-tuple rows to the same dicts as the models' to_dict,
+and a JSON provider that encodes with orjson when it is installed
+"""
+
+from database import AnomalyAlert, Bill, WaterUsage
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, Numeric
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _converter(column):
+    """The conversion to_dict applies to a column's Python value, or None for as-is"""
+    if isinstance(column.type, Numeric):
+        return float
+    if isinstance(column.type, (Date, DateTime)):
+        return _iso
+    return None
+
+
+class RowSerializer:
+    """Selects a fixed list of columns and turns each result tuple into a dict.
+
+    Skips ORM hydration entirely: the query returns plain rows, and each value
+    gets the same conversion the model's to_dict applies (Numeric -> float,
+    dates -> isoformat).
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.keys = [key for key, _, _ in self.fields]
+        self.columns = [column for _, column, _ in self.fields]
+        self.converters = [convert for _, _, convert in self.fields]
+
+    @classmethod
+    def for_model(cls, model, keys):
+        """Serializer for the given to_dict keys of a model, in to_dict order"""
+        table = model.__table__
+        return cls((key, getattr(model, key), _converter(table.c[key])) for key in keys)
+
+    def extend(self, **columns):
+        """Copy with extra columns appended under the given keys, passed through as-is"""
+        return RowSerializer(self.fields + [(key, column, None) for key, column in columns.items()])
+
+    def dict(self, row):
+        return {
+            key: convert(value) if convert is not None and value is not None else value
+            for key, convert, value in zip(self.keys, self.converters, row)
+        }
+
+    def dicts(self, rows):
+        keys = self.keys
+        converters = self.converters
+        return [
+            dict(zip(keys, [
+                convert(value) if convert is not None and value is not None else value
+                for convert, value in zip(converters, row)
+            ]))
+            for row in rows
+        ]
+
+
+usage_serializer = RowSerializer.for_model(WaterUsage, [
+    'id', 'customer_id', 'location_id', 'usage_date', 'daily_usage_ccf',
+    'year', 'month', 'day', 'is_estimated',
+])
+
+bill_serializer = RowSerializer.for_model(Bill, [
+    'id', 'customer_id', 'billing_period_start', 'billing_period_end', 'total_usage_ccf',
+    'total_amount', 'due_date', 'status', 'is_estimated', 'sent_at', 'paid_at',
+])
+
+alert_serializer = RowSerializer.for_model(AnomalyAlert, [
+    'id', 'customer_id', 'alert_date', 'usage_ccf', 'expected_usage_ccf',
+    'deviation_percentage', 'risk_score', 'alert_type', 'status', 'notification_sent', 'created_at',
+])
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with orjson doing the encoding.
+
+    Keys stay sorted and types orjson does not handle natively (Decimal, and
+    dates, which Flask renders as HTTP dates) go through Flask's own default,
+    so responses match the stdlib provider. numpy scalars and arrays, which
+    pandas/scikit-learn results are full of, are encoded as numbers and lists
+    (the stdlib only accepted numpy floats, as a float subclass). Non-ASCII
+    text is emitted as UTF-8 rather than \\u escapes. Pretty-printed (debug)
+    responses use the stdlib.
+    """
+
+    if orjson is not None:
+        options = (
+            orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+        def dumps(self, obj, **kwargs):
+            if kwargs.keys() - {'separators'}:
+                return super().dumps(obj, **kwargs)
+            return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            if (self.compact is None and self._app.debug) or self.compact is False:
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            body = orjson.dumps(obj, default=self.default, option=self.options | orjson.OPT_APPEND_NEWLINE)
+            return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,190 @@
+"""
+Benchmark Service - Precomputed zip code peer benchmarks
+"""
+
+import numpy as np
+import pandas as pd
+from database import db, Bill, Customer, PeerBenchmark
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, func, insert
+import json
+import time
+
+# Fixed quantile sketch stored per benchmark row: p0, p5, ..., p100
+SKETCH_PERCENTILES = np.arange(0, 101, 5)
+ALL_TIME = 0
+
+
+def percentile_rank(quantiles, value):
+    """Approximate percentile of value within a stored quantile sketch"""
+    if not quantiles or value is None:
+        return None
+    return round(float(np.interp(value, quantiles, SKETCH_PERCENTILES)), 1)
+
+
+def _sketch_value(sketch, percentile):
+    return round(float(sketch[percentile // 5]), 2)
+
+
+class BenchmarkService:
+    JOB_NAME = 'refresh_benchmarks'
+
+    def __init__(self, zip_batch_size=50):
+        self.zip_batch_size = zip_batch_size
+
+    # ---- Refresh -----------------------------------------------------------------
+
+    def _load_bills(self, zip_codes):
+        zip_column = func.coalesce(Customer.zip_code, '')
+        rows = db.session.query(
+            zip_column.label('zip_code'),
+            Customer.customer_type,
+            Bill.customer_id,
+            Bill.billing_period_start,
+            Bill.total_amount,
+            Bill.total_usage_ccf,
+        ).join(Customer, Customer.id == Bill.customer_id).filter(zip_column.in_(zip_codes)).all()
+
+        df = pd.DataFrame(rows, columns=[
+            'zip_code', 'customer_type', 'customer_id', 'billing_period_start', 'total_amount', 'total_usage_ccf'
+        ])
+        df['year'] = [d.year for d in df['billing_period_start']]
+        df['month'] = [d.month for d in df['billing_period_start']]
+        df['total_amount'] = df['total_amount'].astype(float)
+        df['total_usage_ccf'] = df['total_usage_ccf'].astype(float)
+        return df
+
+    def _summarize(self, df, keys, now):
+        """One benchmark row per group: counts, means, percentiles and the quantile sketch"""
+        grouped = df.groupby(keys)
+        stats = grouped.agg(
+            customer_count=('customer_id', 'nunique'),
+            bill_count=('customer_id', 'size'),
+            total_revenue=('total_amount', 'sum'),
+            mean_bill=('total_amount', 'mean'),
+            mean_usage_ccf=('total_usage_ccf', 'mean'),
+        )
+        q = SKETCH_PERCENTILES / 100
+        bill_q = grouped['total_amount'].quantile(q).unstack()
+        usage_q = grouped['total_usage_ccf'].quantile(q).unstack()
+
+        rows = []
+        for key, s in stats.iterrows():
+            key = key if isinstance(key, tuple) else (key,)
+            bq = bill_q.loc[key].to_numpy()
+            uq = usage_q.loc[key].to_numpy()
+            row = dict(zip(keys, key))
+            row.setdefault('year', ALL_TIME)
+            row.setdefault('month', ALL_TIME)
+            row.update({
+                'customer_count': int(s.customer_count),
+                'bill_count': int(s.bill_count),
+                'total_revenue': round(float(s.total_revenue), 2),
+                'mean_bill': round(float(s.mean_bill), 2),
+                'mean_usage_ccf': round(float(s.mean_usage_ccf), 2),
+                'p10_bill': _sketch_value(bq, 10),
+                'p25_bill': _sketch_value(bq, 25),
+                'p50_bill': _sketch_value(bq, 50),
+                'p75_bill': _sketch_value(bq, 75),
+                'p90_bill': _sketch_value(bq, 90),
+                'p10_usage_ccf': _sketch_value(uq, 10),
+                'p50_usage_ccf': _sketch_value(uq, 50),
+                'p90_usage_ccf': _sketch_value(uq, 90),
+                'bill_quantiles': json.dumps([round(float(v), 2) for v in bq]),
+                'usage_quantiles': json.dumps([round(float(v), 2) for v in uq]),
+                'refreshed_at': now,
+            })
+            rows.append(row)
+        return rows
+
+    def refresh(self):
+        """Recompute every benchmark row from bills, a batch of zip codes at a time.
+
+        Each batch replaces its zip codes' rows in one transaction, so readers
+        never see a partially refreshed zip; rows for zip codes that no longer
+        have customers are removed at the end.
+        """
+        started = time.perf_counter()
+        # Whole seconds so the stale-row cutoff survives TIMESTAMP truncation
+        now = datetime.utcnow().replace(microsecond=0)
+        zip_codes = [
+            z for (z,) in db.session.query(func.coalesce(Customer.zip_code, '')).distinct().all()
+        ]
+
+        written = 0
+        for i in range(0, len(zip_codes), self.zip_batch_size):
+            batch = zip_codes[i:i + self.zip_batch_size]
+            df = self._load_bills(batch)
+
+            rows = []
+            if not df.empty:
+                rows = self._summarize(df, ['zip_code', 'customer_type', 'year', 'month'], now)
+                rows += self._summarize(df, ['zip_code', 'customer_type'], now)
+
+            db.session.execute(delete(PeerBenchmark).where(PeerBenchmark.zip_code.in_(batch)))
+            if rows:
+                db.session.execute(insert(PeerBenchmark), rows)
+            db.session.commit()
+            written += len(rows)
+
+        db.session.execute(delete(PeerBenchmark).where(PeerBenchmark.refreshed_at < now))
+        db.session.commit()
+
+        return {
+            'zip_codes': len(zip_codes),
+            'benchmark_rows': written,
+            'elapsed_seconds': round(time.perf_counter() - started, 2),
+        }
+
+    def run_refresh(self):
+        """Refresh and record the run as a job"""
+        from services.job_service import JobService
+        return JobService().run(self.JOB_NAME, self.refresh)
+
+    # ---- Lookups -----------------------------------------------------------------
+
+    # Lookups only read: benchmarks are built by billing runs, the
+    # refresh-benchmarks command and the startup seed step
+
+    def zip_benchmarks(self, zip_code, year=None, month=None):
+        """Benchmark rows for one zip code: one bill month, or all time.
+
+        Rows exist per month and for all time only, so year and month go together.
+        """
+        if (year is None) != (month is None):
+            raise ValueError('year and month must be given together')
+        return PeerBenchmark.query.filter_by(
+            zip_code=zip_code or '', year=year or ALL_TIME, month=month or ALL_TIME
+        ).order_by(PeerBenchmark.customer_type).all()
+
+    def all_time_benchmarks(self):
+        """All-time rows for every zip code, ordered by zip and type"""
+        return PeerBenchmark.query.filter(
+            PeerBenchmark.year == ALL_TIME, PeerBenchmark.zip_code != ''
+        ).order_by(PeerBenchmark.zip_code, PeerBenchmark.customer_type).all()
+
+    def customer_position(self, customer, benchmark, year=None, month=None):
+        """Where a customer's monthly bill and usage fall within their peer benchmark"""
+        query = db.session.query(
+            func.avg(Bill.total_amount), func.avg(Bill.total_usage_ccf)
+        ).filter(Bill.customer_id == customer.id)
+        if year and month:
+            first_day = date(year, month, 1)
+            query = query.filter(
+                Bill.billing_period_start >= first_day,
+                Bill.billing_period_start < first_day + relativedelta(months=1)
+            )
+        avg_bill, avg_usage = query.one()
+        if avg_bill is None:
+            return None
+
+        avg_bill = float(avg_bill)
+        avg_usage = float(avg_usage)
+        return {
+            'customer_type': customer.customer_type,
+            'avg_monthly_bill': round(avg_bill, 2),
+            'avg_monthly_usage_ccf': round(avg_usage, 2),
+            'bill_percentile': percentile_rank(json.loads(benchmark.bill_quantiles or '[]'), avg_bill),
+            'usage_percentile': percentile_rank(json.loads(benchmark.usage_quantiles or '[]'), avg_usage),
+        }
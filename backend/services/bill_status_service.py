@@ -0,0 +1,56 @@
+"""
+Bill Status Service - Set-based bill status maintenance
+"""
+
+from database import db, Bill
+from datetime import datetime
+from sqlalchemy import update
+import time
+
+
+class BillStatusService:
+    JOB_NAME = 'bill_status'
+
+    def update_statuses(self, as_of=None):
+        """Move bills between statuses with set-based UPDATEs.
+
+        Both statements are range predicates on due_date so they are driven by
+        idx_due_date: bills past their due date become overdue, and bills whose
+        period has closed but are not yet due move from pending to sent. Paid bills
+        are never touched.
+        """
+        today = as_of or datetime.now().date()
+        now = datetime.utcnow()
+        result = {'as_of': today.isoformat()}
+
+        started = time.perf_counter()
+        overdue = db.session.execute(
+            update(Bill)
+            .where(Bill.due_date < today, Bill.status.in_(['pending', 'sent']))
+            .values(status='overdue', updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        result['marked_overdue'] = overdue.rowcount
+        result['overdue_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        sent = db.session.execute(
+            update(Bill)
+            .where(
+                Bill.due_date >= today,
+                Bill.billing_period_end < today,
+                Bill.status == 'pending'
+            )
+            .values(status='sent', sent_at=db.func.coalesce(Bill.sent_at, now), updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        result['marked_sent'] = sent.rowcount
+        result['sent_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        db.session.commit()
+        return result
+
+    def run(self, as_of=None):
+        """Run the status update and record it as a job run"""
+        from services.job_service import JobService
+        return JobService().run(self.JOB_NAME, self.update_statuses, as_of)
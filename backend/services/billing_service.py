@@ -2,11 +2,36 @@
 Billing calculation service
 """
 
-from database import db, Customer, WaterUsage, BillingRate, Bill, ZipCodeRate
+from database import db, bulk_upsert, Customer, WaterUsage, BillingRate, Bill, ZipCodeRate
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from services.rollup_service import RollupService
 from sqlalchemy import func
 
+DEFAULT_RATE_PER_CCF = 5.72
+
 class BillingService:
+    def _load_rate_tables(self):
+        """Load active zip code and customer-type rates in two queries.
+        Used by fleet-wide jobs so rates are not re-queried per customer."""
+        zip_rates = {
+            r.zip_code: float(r.rate_per_ccf)
+            for r in ZipCodeRate.query.filter_by(is_active=True).all()
+        }
+        type_rates = {}
+        for r in BillingRate.query.filter_by(is_active=True).order_by(BillingRate.id).all():
+            if r.customer_type not in type_rates and r.flat_rate is not None:
+                type_rates[r.customer_type] = float(r.flat_rate)
+        return zip_rates, type_rates
+
+    def _resolve_rate_from_tables(self, custom_rate, zip_code, customer_type, zip_rates, type_rates):
+        """Same priority as _resolve_rate, against preloaded rate tables."""
+        if custom_rate is not None:
+            return float(custom_rate)
+        if zip_code and zip_code in zip_rates:
+            return zip_rates[zip_code]
+        return type_rates.get(customer_type, DEFAULT_RATE_PER_CCF)
+
     def _resolve_rate(self, customer):
         """Resolve effective rate for a customer.
         Priority: customer override > zip code rate > customer-type rate > default."""
@@ -26,7 +51,7 @@ class BillingService:
         if type_rate:
             return float(type_rate.flat_rate)
 
-        return 5.72  # Default fallback
+        return DEFAULT_RATE_PER_CCF  # Default fallback
 
     def calculate_bill(self, customer_id, start_date, end_date):
         """Calculate bill for period"""
@@ -77,95 +102,128 @@ class BillingService:
             'rate_per_ccf': rate_value
         }
     
-    def generate_historical_bills(self):
-        """Generate bills for all customers for all historical months"""
+    def upsert_bills(self, bills, refresh=False):
+        """Bulk-write bills keyed on (customer_id, billing_period_start, billing_period_end).
+
+        Every bill producer writes through here so reruns never double-bill. With
+        refresh=True an existing unpaid bill's usage, amount and due date are
+        replaced; paid bills, and every existing bill otherwise, are left as they are.
+        Returns the driver's affected-row count (see bulk_upsert), not a bill count.
+        """
+        now = datetime.utcnow()
+        rows = [{
+            'customer_id': b['customer_id'],
+            'billing_period_start': b['billing_period_start'],
+            'billing_period_end': b['billing_period_end'],
+            'total_usage_ccf': b['total_usage_ccf'],
+            'total_amount': b['total_amount'],
+            'due_date': b['due_date'],
+            'status': b.get('status', 'pending'),
+            'is_estimated': b.get('is_estimated', False),
+            'created_at': now,
+            'updated_at': now,
+        } for b in bills]
+
+        update_columns = ()
+        if refresh:
+            update_columns = ('total_usage_ccf', 'total_amount', 'due_date', 'is_estimated', 'updated_at')
+
+        return bulk_upsert(
+            Bill, rows,
+            key_columns=('customer_id', 'billing_period_start', 'billing_period_end'),
+            update_columns=update_columns,
+            keep_when=Bill.__table__.c.status == 'paid'
+        )
+
+    def _existing_periods(self, customer_ids):
+        """(customer_id, period start, period end) of the customers' stored bills"""
+        return set(db.session.query(
+            Bill.customer_id, Bill.billing_period_start, Bill.billing_period_end
+        ).filter(Bill.customer_id.in_(customer_ids)).all())
+
+    def generate_historical_bills(self, customer_chunk_size=500):
+        """Generate bills for all customers for all historical months.
+
+        Monthly usage is read per chunk of customers from the monthly rollup and
+        written through upsert_bills, so existing bills are skipped by the natural
+        key rather than checked one month at a time. Statuses are assigned afterwards
+        by the bill status job. total_bills counts the bills created and
+        skipped_existing the periods that already had one.
+        """
         try:
-            customers = Customer.query.all()
-            total_bills = 0
-            
-            for customer in customers:
-                # Get date range for this customer's data
-                first_usage = WaterUsage.query.filter_by(
-                    customer_id=customer.id
-                ).order_by(WaterUsage.usage_date).first()
-                
-                last_usage = WaterUsage.query.filter_by(
-                    customer_id=customer.id
-                ).order_by(WaterUsage.usage_date.desc()).first()
-                
-                if not first_usage or not last_usage:
-                    continue
-                
-                # Generate monthly bills
-                current_date = first_usage.usage_date.replace(day=1)
-                end_date = last_usage.usage_date
-                
-                while current_date <= end_date:
-                    # Calculate month end
-                    if current_date.month == 12:
-                        month_end = current_date.replace(day=31)
-                    else:
-                        next_month = current_date.replace(month=current_date.month + 1)
-                        month_end = (next_month - timedelta(days=1))
-                    
-                    # Don't exceed data range
-                    if month_end > end_date:
-                        month_end = end_date
-                    
-                    # Check if bill already exists
-                    existing_bill = Bill.query.filter_by(
-                        customer_id=customer.id,
-                        billing_period_start=current_date,
-                        billing_period_end=month_end
-                    ).first()
-                    
-                    if not existing_bill:
-                        # Calculate usage for this period
-                        bill_info = self.calculate_bill(customer.id, current_date, month_end)
-                        
-                        if bill_info and bill_info['total_usage_ccf'] > 0:
-                            # Create bill
-                            due_date = month_end + timedelta(days=15)
-                            
-                            # Determine status based on date
-                            if month_end < datetime.now().date():
-                                if due_date < datetime.now().date():
-                                    status = 'overdue'
-                                else:
-                                    status = 'sent'
-                            else:
-                                status = 'pending'
-                            
-                            bill = Bill(
-                                customer_id=customer.id,
-                                billing_period_start=current_date,
-                                billing_period_end=month_end,
-                                total_usage_ccf=bill_info['total_usage_ccf'],
-                                total_amount=bill_info['total_amount'],
-                                due_date=due_date,
-                                status=status
-                            )
-                            db.session.add(bill)
-                            total_bills += 1
-                    
-                    # Move to next month
-                    if current_date.month == 12:
-                        current_date = current_date.replace(year=current_date.year + 1, month=1)
-                    else:
-                        current_date = current_date.replace(month=current_date.month + 1)
-                
-                # Commit every customer to avoid memory issues
+            zip_rates, type_rates = self._load_rate_tables()
+            customers = db.session.query(
+                Customer.id, Customer.zip_code, Customer.customer_type, Customer.custom_rate_per_ccf
+            ).order_by(Customer.id).all()
+            total_bills = skipped_existing = 0
+
+            for i in range(0, len(customers), customer_chunk_size):
+                chunk = customers[i:i + customer_chunk_size]
+                rates = {
+                    c.id: self._resolve_rate_from_tables(
+                        c.custom_rate_per_ccf, c.zip_code, c.customer_type, zip_rates, type_rates
+                    )
+                    for c in chunk
+                }
+
+                monthly = RollupService().monthly_usage(customer_ids=list(rates.keys()))
+
+                # The last billed month ends at the customer's last usage date
+                last_usage = {}
+                for row in monthly:
+                    if row.customer_id not in last_usage or row.last_usage_date > last_usage[row.customer_id]:
+                        last_usage[row.customer_id] = row.last_usage_date
+
+                existing = self._existing_periods(list(rates.keys()))
+                bills = []
+                for row in monthly:
+                    total_usage = float(row.total_usage_ccf or 0)
+                    if total_usage <= 0:
+                        continue
+
+                    period_start = datetime(row.year, row.month, 1).date()
+                    month_end = (period_start + relativedelta(months=1)) - timedelta(days=1)
+                    month_end = min(month_end, last_usage[row.customer_id])
+                    if (row.customer_id, period_start, month_end) in existing:
+                        skipped_existing += 1
+                        continue
+
+                    bills.append({
+                        'customer_id': row.customer_id,
+                        'billing_period_start': period_start,
+                        'billing_period_end': month_end,
+                        'total_usage_ccf': total_usage,
+                        'total_amount': total_usage * rates[row.customer_id],
+                        'due_date': month_end + timedelta(days=15),
+                        'status': 'pending',
+                    })
+
+                # The natural key still guards against a concurrent run inserting first
+                self.upsert_bills(bills)
+                total_bills += len(bills)
+
+                # Commit every chunk to avoid memory issues
                 db.session.commit()
-                print(f"Generated bills for customer {customer.customer_name}")
-            
+                print(f"Generated bills for customers {i + 1}-{i + len(chunk)} of {len(customers)}")
+
+            # New bills start as pending; the status job moves them to sent/overdue
+            from services.bill_status_service import BillStatusService
+            status_update = BillStatusService().run()
+
+            from services.benchmark_service import BenchmarkService
+            benchmark_refresh = BenchmarkService().run_refresh()
+
             return {
                 'message': 'Historical bills generated',
-                'total_bills': total_bills
+                'total_bills': total_bills,
+                'skipped_existing': skipped_existing,
+                'status_update': status_update,
+                'benchmark_refresh': benchmark_refresh
             }
-            
+
         except Exception as e:
             db.session.rollback()
             print(f"Bill generation error: {str(e)}")
             import traceback
             traceback.print_exc()
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
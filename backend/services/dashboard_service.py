@@ -0,0 +1,128 @@
+"""
+Dashboard Service - Everything a customer dashboard needs in one call
+"""
+
+from database import db, AnomalyAlert, Bill, Customer, UsageForecast, User, WaterUsage
+from datetime import datetime, timedelta
+
+SECTIONS = ['user', 'customer', 'summary', 'usage', 'bills', 'alerts', 'forecasts', 'peers']
+RECENT_BILLS = 12
+NEW_ALERTS = 20
+UPCOMING_FORECASTS = 30
+
+
+class DashboardService:
+    def _load_identity(self, user_id):
+        """User and customer columns in one joined query"""
+        row = db.session.query(User, Customer).outerjoin(
+            Customer, Customer.user_id == User.id
+        ).filter(User.id == user_id).first()
+        return row if row else (None, None)
+
+    # ---- Sections (small indexed reads on the request's session) -----------------
+
+    def _summary(self, customer, start_date, end_date):
+        from services.usage_summary_service import UsageSummaryService
+        return UsageSummaryService().summarize(customer, start_date, end_date)
+
+    def _usage(self, customer, start_date, end_date):
+        rows = db.session.query(
+            WaterUsage.usage_date, WaterUsage.daily_usage_ccf, WaterUsage.is_estimated
+        ).filter(
+            WaterUsage.customer_id == customer.id,
+            WaterUsage.usage_date >= start_date,
+            WaterUsage.usage_date <= end_date
+        ).order_by(WaterUsage.usage_date).all()
+        return [{
+            'usage_date': r.usage_date.isoformat(),
+            'daily_usage_ccf': float(r.daily_usage_ccf),
+            'is_estimated': r.is_estimated
+        } for r in rows]
+
+    def _bills(self, customer, start_date, end_date):
+        bills = Bill.query.filter(
+            Bill.customer_id == customer.id,
+            Bill.billing_period_end <= datetime.now().date()
+        ).order_by(Bill.billing_period_end.desc()).limit(RECENT_BILLS).all()
+        return [b.to_dict() for b in bills]
+
+    def _alerts(self, customer, start_date, end_date):
+        alerts = AnomalyAlert.query.filter_by(
+            customer_id=customer.id, status='new'
+        ).order_by(AnomalyAlert.alert_date.desc()).limit(NEW_ALERTS).all()
+        return [a.to_dict() for a in alerts]
+
+    def _forecasts(self, customer, start_date, end_date):
+        forecasts = UsageForecast.query.filter(
+            UsageForecast.customer_id == customer.id,
+            UsageForecast.forecast_date >= datetime.now().date()
+        ).order_by(UsageForecast.forecast_date).limit(UPCOMING_FORECASTS).all()
+        return [f.to_dict() for f in forecasts]
+
+    def _peers(self, customer, start_date, end_date):
+        if not customer.zip_code:
+            return {'zip_code': None, 'averages': [], 'your_position': None}
+        from services.benchmark_service import BenchmarkService
+        benchmark_service = BenchmarkService()
+        averages = []
+        your_position = None
+        for b in benchmark_service.zip_benchmarks(customer.zip_code):
+            d = b.to_dict()
+            averages.append({k: d[k] for k in (
+                'customer_type', 'avg_monthly_bill', 'avg_monthly_usage_ccf',
+                'customer_count', 'bill_percentiles', 'usage_percentiles'
+            )})
+            if b.customer_type == customer.customer_type:
+                your_position = benchmark_service.customer_position(customer, b)
+        return {'zip_code': customer.zip_code, 'averages': averages, 'your_position': your_position}
+
+    # ---- Bundle ------------------------------------------------------------------
+
+    def _sparse(self, value, fields):
+        """Keep only the requested keys of a dict or of every dict in a list"""
+        if not fields:
+            return value
+        if isinstance(value, list):
+            return [{k: v for k, v in item.items() if k in fields} for item in value]
+        if isinstance(value, dict):
+            return {k: v for k, v in value.items() if k in fields}
+        return value
+
+    def bundle(self, user_id, sections=None, fields=None, start_date=None, end_date=None):
+        """Gather the requested dashboard sections for a customer user.
+
+        User and customer are loaded once; the remaining sections are small
+        indexed reads run one after another on the request's session, so a page
+        view holds one pooled connection and its queries count towards the
+        request's DB stats and statement timeout. fields maps a section to the
+        keys to keep. Returns (payload, error).
+        """
+        sections = sections or SECTIONS
+        unknown = [s for s in sections if s not in SECTIONS]
+        if unknown:
+            return None, f"Unknown sections: {', '.join(unknown)}. Valid: {', '.join(SECTIONS)}"
+
+        user, customer = self._load_identity(user_id)
+        if not user:
+            return None, 'User not found'
+        if not customer:
+            return None, 'Customer profile not found'
+
+        end_date = end_date or datetime.now().date()
+        start_date = start_date or end_date - timedelta(days=30)
+
+        payload = {}
+        if 'user' in sections:
+            payload['user'] = user.to_dict()
+        if 'customer' in sections:
+            payload['customer'] = customer.to_dict()
+
+        for name in sections:
+            if name not in ('user', 'customer'):
+                payload[name] = getattr(self, f'_{name}')(customer, start_date, end_date)
+
+        for name, keys in (fields or {}).items():
+            if name in payload:
+                payload[name] = self._sparse(payload[name], keys)
+
+        return payload, None
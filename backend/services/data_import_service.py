@@ -4,6 +4,10 @@ Data Import Service - Import usage data from CSV/XLSX
 
 import pandas as pd
 from database import db, Customer, WaterUsage, User
+from services.rollup_service import RollupService
+from services.stats_service import StatsService
+from services.leaderboard_service import LeaderboardService
+from services.usage_summary_service import invalidate_customer_summaries
 from datetime import datetime
 import bcrypt
 from flask import current_app
@@ -53,6 +57,9 @@ class DataImportService:
             customers_created = 0
             errors = []
             failed_location_ids = set()
+            rollup_service = RollupService()
+            stats_service = StatsService()
+            pending_rollup = []  # usage written since the last commit
 
             for idx, row in df.iterrows():
                 try:
@@ -99,6 +106,7 @@ class DataImportService:
                         )
                         db.session.add(customer)
                         db.session.flush()
+                        stats_service.record_customer(customer)
                         customers_created += 1
                     
                     # Create usage record
@@ -126,11 +134,22 @@ class DataImportService:
                             is_estimated=False
                         )
                         db.session.add(usage)
+                        pending_rollup.append({
+                            'customer_id': customer.id,
+                            'zip_code': customer.zip_code,
+                            'customer_type': customer.customer_type,
+                            'usage_date': usage_date,
+                            'daily_usage_ccf': usage.daily_usage_ccf,
+                        })
                         imported_count += 1
                     
                     # Commit every 1000 records
                     if (idx + 1) % 1000 == 0:
+                        rollup_service.record_usage(pending_rollup)
+                        stats_service.record_usage(pending_rollup)
                         db.session.commit()
+                        invalidate_customer_summaries(r['customer_id'] for r in pending_rollup)
+                        pending_rollup = []
                         print(f"Processed {idx + 1} records...")
                         
                 except Exception as e:
@@ -138,9 +157,15 @@ class DataImportService:
                     failed_location_ids.add(location_id_str)
                     errors.append(f"Row {idx + 1} (location {location_id_str}): {str(e)}")
                     db.session.rollback()
+                    pending_rollup = []
             
             # Final commit
+            rollup_service.record_usage(pending_rollup)
+            stats_service.record_usage(pending_rollup)
             db.session.commit()
+            invalidate_customer_summaries(r['customer_id'] for r in pending_rollup)
+            if imported_count:
+                LeaderboardService().run_refresh()
             
             print(f"Import completed: {imported_count} records, {customers_created} customers created")
             
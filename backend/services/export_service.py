@@ -0,0 +1,147 @@
+"""
+Export Service - Streaming CSV/NDJSON extracts of large tables
+"""
+
+from database import db, AnomalyAlert, Bill, Customer, WaterUsage
+from db_routing import use_replica
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import select
+import csv
+import io
+import json
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def _dataset(columns, date_column, order_by, status_column=None, period_columns=None):
+    return {
+        'columns': columns,
+        'date_column': date_column,
+        'period_columns': period_columns,
+        'status_column': status_column,
+        'order_by': order_by,
+    }
+
+
+DATASETS = {
+    'water_usage': _dataset(
+        columns=[
+            WaterUsage.id, WaterUsage.customer_id, WaterUsage.location_id, WaterUsage.usage_date,
+            WaterUsage.daily_usage_ccf, WaterUsage.is_estimated,
+            Customer.zip_code, Customer.customer_type,
+        ],
+        date_column=WaterUsage.usage_date,
+        order_by=[WaterUsage.usage_date, WaterUsage.id],
+    ),
+    'bills': _dataset(
+        columns=[
+            Bill.id, Bill.customer_id, Bill.billing_period_start, Bill.billing_period_end,
+            Bill.total_usage_ccf, Bill.total_amount, Bill.due_date, Bill.status, Bill.is_estimated,
+            Bill.sent_at, Bill.paid_at,
+            Customer.zip_code, Customer.customer_type,
+        ],
+        date_column=None,
+        period_columns=(Bill.billing_period_start, Bill.billing_period_end),
+        status_column=Bill.status,
+        order_by=[Bill.billing_period_start, Bill.id],
+    ),
+    'anomaly_alerts': _dataset(
+        columns=[
+            AnomalyAlert.id, AnomalyAlert.customer_id, AnomalyAlert.alert_date, AnomalyAlert.usage_ccf,
+            AnomalyAlert.expected_usage_ccf, AnomalyAlert.deviation_percentage, AnomalyAlert.risk_score,
+            AnomalyAlert.alert_type, AnomalyAlert.status, AnomalyAlert.notification_sent,
+            AnomalyAlert.created_at, AnomalyAlert.resolved_at,
+            Customer.zip_code, Customer.customer_type,
+        ],
+        date_column=AnomalyAlert.alert_date,
+        status_column=AnomalyAlert.status,
+        order_by=[AnomalyAlert.alert_date, AnomalyAlert.id],
+    ),
+}
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class ExportService:
+    def __init__(self, chunk_size=5000):
+        self.chunk_size = chunk_size
+
+    def build_query(self, dataset, filters):
+        """Select statement for a dataset and filters. Returns (statement, error)."""
+        spec = DATASETS.get(dataset)
+        if not spec:
+            return None, f"dataset must be one of: {', '.join(DATASETS)}"
+
+        model_table = spec['columns'][0].table
+        stmt = select(*spec['columns']).select_from(model_table).join(
+            Customer, Customer.id == spec['columns'][1]
+        )
+
+        start_date = filters.get('start_date')
+        end_date = filters.get('end_date')
+        if spec['period_columns']:
+            # Bills overlapping the window
+            period_start, period_end = spec['period_columns']
+            if start_date:
+                stmt = stmt.where(period_end >= start_date)
+            if end_date:
+                stmt = stmt.where(period_start <= end_date)
+        else:
+            if start_date:
+                stmt = stmt.where(spec['date_column'] >= start_date)
+            if end_date:
+                stmt = stmt.where(spec['date_column'] <= end_date)
+
+        if filters.get('status'):
+            if spec['status_column'] is None:
+                return None, f'status filter is not supported for {dataset}'
+            stmt = stmt.where(spec['status_column'] == filters['status'])
+        if filters.get('zip_code'):
+            stmt = stmt.where(Customer.zip_code == filters['zip_code'])
+        if filters.get('customer_type'):
+            stmt = stmt.where(Customer.customer_type == filters['customer_type'])
+        if filters.get('customer_id'):
+            stmt = stmt.where(spec['columns'][1] == filters['customer_id'])
+
+        # Exports are long by design; exempt them from the serving statement timeout
+        stmt = stmt.prefix_with('/*+ MAX_EXECUTION_TIME(0) */', dialect='mysql')
+        return stmt.order_by(*spec['order_by']), None
+
+    def stream(self, stmt, fmt):
+        """Yield the export body chunk by chunk from a server-side cursor.
+
+        yield_per makes SQLAlchemy fetch through an unbuffered cursor, so only one
+        chunk of rows is ever held in memory and the first bytes go out as soon as
+        the database returns the first rows. The scan runs on the read replica when
+        one is configured and current enough.
+        """
+        with use_replica():
+            result = db.session.execute(stmt.execution_options(yield_per=self.chunk_size))
+        header = list(result.keys())
+
+        try:
+            if fmt == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(header)
+                yield buffer.getvalue()
+                for rows in result.partitions():
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(rows)
+                    yield buffer.getvalue()
+            else:
+                for rows in result.partitions():
+                    yield ''.join(
+                        json.dumps({k: _json_value(v) for k, v in zip(header, row)}) + '\n'
+                        for row in rows
+                    )
+        finally:
+            result.close()
@@ -0,0 +1,53 @@
+"""
+Job Service - Record maintenance job runs with counts and timings
+"""
+
+from database import db, statement_timeout, JobRun
+from datetime import datetime
+import json
+import time
+
+
+class JobService:
+    def run(self, job_name, fn, *args, **kwargs):
+        """Run fn and record it in job_runs.
+
+        fn returns a dict of counts/timings which is stored as the run details.
+        The result is returned with the job run attached under 'job_run'.
+        Jobs are exempt from DB_STATEMENT_TIMEOUT_MS, which is meant for
+        interactive reads, even when an admin request runs them.
+        """
+        job_run = JobRun(job_name=job_name, status='running', started_at=datetime.utcnow())
+        db.session.add(job_run)
+        db.session.commit()
+        job_run_id = job_run.id
+
+        started = time.perf_counter()
+        try:
+            with statement_timeout(0):
+                result = fn(*args, **kwargs)
+            status = 'failed' if isinstance(result, dict) and 'error' in result else 'completed'
+        except Exception as e:
+            db.session.rollback()
+            print(f"Job {job_name} failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            result = {'error': str(e)}
+            status = 'failed'
+
+        job_run = JobRun.query.get(job_run_id)
+        job_run.status = status
+        job_run.finished_at = datetime.utcnow()
+        job_run.duration_ms = int((time.perf_counter() - started) * 1000)
+        job_run.details = json.dumps(result, default=str)
+        db.session.commit()
+
+        print(f"Job {job_name} {status} in {job_run.duration_ms} ms")
+        return {**result, 'job_run': job_run.to_dict()}
+
+    def recent_runs(self, job_name=None, limit=50):
+        """Most recent job runs, newest first"""
+        query = JobRun.query
+        if job_name:
+            query = query.filter_by(job_name=job_name)
+        return query.order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit).all()
@@ -0,0 +1,124 @@
+"""
+Leaderboard Service - Precomputed top customers by usage
+"""
+
+from database import db, Customer, User, UsageLeaderboard
+from db_routing import use_primary
+from services.rollup_service import RollupService, month_start
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert
+import time
+
+# Customers kept per window; larger requests fall back to the rollups
+LEADERBOARD_SIZE = 100
+
+WINDOWS = ['this_month', 'last_7_days', 'last_30_days', 'last_90_days', 'last_365_days', 'this_year']
+
+
+def window_range(window_key, today):
+    """(start_date, end_date) for a named window ending today, or None if unknown"""
+    if window_key == 'this_month':
+        return month_start(today), today
+    if window_key == 'this_year':
+        return today.replace(month=1, day=1), today
+    if window_key.startswith('last_') and window_key.endswith('_days'):
+        days = window_key[len('last_'):-len('_days')]
+        if days in ('7', '30', '90', '365'):
+            return today - timedelta(days=int(days)), today
+    return None
+
+
+class LeaderboardService:
+    JOB_NAME = 'refresh_leaderboards'
+
+    def __init__(self):
+        self.rollup_service = RollupService()
+
+    def refresh(self, as_of=None):
+        """Recompute the top customers for every window as of a day"""
+        started = time.perf_counter()
+        today = as_of or datetime.now().date()
+
+        for window_key in WINDOWS:
+            start_date, end_date = window_range(window_key, today)
+            totals = self.rollup_service.customer_totals(start_date, end_date, limit=LEADERBOARD_SIZE)
+            db.session.execute(delete(UsageLeaderboard).where(UsageLeaderboard.window_key == window_key))
+            if totals:
+                db.session.execute(insert(UsageLeaderboard), [{
+                    'window_key': window_key,
+                    'customer_id': row.customer_id,
+                    'rank_position': position,
+                    'total_usage_ccf': row.total_usage,
+                    'record_count': row.record_count,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'as_of': today,
+                } for position, row in enumerate(totals, start=1)])
+        db.session.commit()
+
+        return {
+            'as_of': today.isoformat(),
+            'windows': len(WINDOWS),
+            'elapsed_seconds': round(time.perf_counter() - started, 2),
+        }
+
+    def run_refresh(self, as_of=None):
+        """Refresh and record the run as a job"""
+        from services.job_service import JobService
+        return JobService().run(self.JOB_NAME, self.refresh, as_of)
+
+    def _match_window(self, start_date, end_date, today):
+        for window_key in WINDOWS:
+            if window_range(window_key, today) == (start_date, end_date):
+                return window_key
+        return None
+
+    def top_customers(self, window_key=None, start_date=None, end_date=None, limit=15):
+        """Top customers by usage: [(customer_id, total_usage, record_count)], plus where
+        they came from: {'source', 'as_of', 'start_date', 'end_date'}.
+
+        Named windows are read from the latest leaderboard snapshot, even one built
+        on an earlier day; as_of and the window's dates say which. Reads never
+        rebuild it: the refresh-leaderboards job and usage imports do. Explicit
+        date ranges use the snapshot only when it is from today and equal one of
+        its windows; other ranges, larger limits and
+        an empty leaderboard are aggregated from the monthly rollup.
+        """
+        today = datetime.now().date()
+        named = window_key is not None
+        if window_key is None and end_date in (None, today) and start_date:
+            window_key = self._match_window(start_date, today, today)
+
+        if window_key and limit <= LEADERBOARD_SIZE:
+            # Small indexed reads, kept on the primary so the snapshot date and
+            # the rows agree with the refresh that wrote them
+            with use_primary():
+                snapshot = db.session.query(
+                    UsageLeaderboard.as_of, UsageLeaderboard.start_date, UsageLeaderboard.end_date
+                ).filter(UsageLeaderboard.window_key == window_key).limit(1).first()
+                if snapshot is not None and (named or snapshot.as_of == today):
+                    rows = db.session.query(
+                        UsageLeaderboard.customer_id,
+                        UsageLeaderboard.total_usage_ccf.label('total_usage'),
+                        UsageLeaderboard.record_count,
+                    ).filter(
+                        UsageLeaderboard.window_key == window_key
+                    ).order_by(UsageLeaderboard.rank_position).limit(limit).all()
+                    return rows, {
+                        'source': 'leaderboard',
+                        'as_of': snapshot.as_of,
+                        'start_date': snapshot.start_date,
+                        'end_date': snapshot.end_date,
+                    }
+
+        if window_key:
+            start_date, end_date = window_range(window_key, today)
+        rows = self.rollup_service.customer_totals(start_date, end_date, limit=limit)
+        return rows, {'source': 'rollup', 'as_of': today, 'start_date': start_date, 'end_date': end_date}
+
+    def customer_details(self, customer_ids):
+        """Name, email and type for a set of customers in one query"""
+        rows = db.session.query(
+            Customer.id, Customer.customer_name, Customer.customer_type, User.email
+        ).outerjoin(User, User.id == Customer.user_id).filter(Customer.id.in_(customer_ids)).all()
+        return {r.id: r for r in rows}
@@ -5,6 +5,7 @@ Machine Learning Service - Forecasting and Anomaly Detection
 import pandas as pd
 import numpy as np
 from database import db, WaterUsage, UsageForecast, AnomalyAlert, Customer, BillingRate
+from db_routing import read_replica
 from datetime import datetime, timedelta
 from prophet import Prophet
 from sklearn.ensemble import IsolationForest
@@ -17,6 +18,7 @@ class MLService:
         self.model_dir = 'ml_models'
         os.makedirs(self.model_dir, exist_ok=True)
     
+    @read_replica()
     def get_usage_data(self, customer_id, days=365):
         """Get historical usage data for customer"""
         end_date = datetime.now().date()
@@ -58,7 +60,8 @@ class MLService:
             recent_365 = df['y'].mean()
             
             # Weighted average: more weight on recent data
-            predicted_daily = (recent_30 * 0.5 + recent_90 * 0.3 + recent_365 * 0.2)
+            # Plain float: pandas means are numpy.float64
+            predicted_daily = float(recent_30 * 0.5 + recent_90 * 0.3 + recent_365 * 0.2)
             
             # Get customer and billing rate
             customer = Customer.query.get(customer_id)
@@ -112,19 +115,14 @@ class MLService:
             traceback.print_exc()
             return {'error': str(e)}
     
+    @read_replica()
     def get_system_usage_data(self, days=730):
-        """Get aggregated daily usage across all customers"""
-        from sqlalchemy import func
+        """Get aggregated daily usage across all customers (from the system rollup)"""
+        from services.rollup_service import RollupService
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
-        results = db.session.query(
-            WaterUsage.usage_date,
-            func.sum(WaterUsage.daily_usage_ccf).label('total_usage')
-        ).filter(
-            WaterUsage.usage_date >= start_date,
-            WaterUsage.usage_date <= end_date
-        ).group_by(WaterUsage.usage_date).order_by(WaterUsage.usage_date).all()
+        results = RollupService().system_daily(start_date, end_date)
 
         if not results:
             return pd.DataFrame()
@@ -151,7 +149,8 @@ class MLService:
             recent_90 = df.tail(90)['y'].mean() if len(df) >= 90 else recent_30
             recent_365 = df['y'].mean()
 
-            predicted_daily = (recent_30 * 0.5 + recent_90 * 0.3 + recent_365 * 0.2)
+            # Plain float: pandas means are numpy.float64
+            predicted_daily = float(recent_30 * 0.5 + recent_90 * 0.3 + recent_365 * 0.2)
 
             default_rate = float(os.getenv('DEFAULT_RATE_PER_CCF', 5.72))
 
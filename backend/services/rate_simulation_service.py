@@ -0,0 +1,257 @@
+"""
+Rate Simulation Service - What-if revenue projections for candidate rate tables
+"""
+
+import numpy as np
+import pandas as pd
+from database import db, Customer
+from services.billing_service import BillingService
+from services.rollup_service import RollupService
+
+# Most specific match wins: zip + type, then zip only, then type only, then catch-all
+MATCH_LEVELS = [
+    ('zip_code', 'customer_type'),
+    ('zip_code',),
+    ('customer_type',),
+    (),
+]
+
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+
+class RateSimulationService:
+    def __init__(self):
+        self.billing_service = BillingService()
+
+    def _parse_rate_table(self, rates):
+        """Validate candidate rate entries. Returns (entries, error)."""
+        if not isinstance(rates, list) or not rates:
+            return None, 'rates must be a non-empty list'
+
+        entries = []
+        for i, entry in enumerate(rates):
+            if not isinstance(entry, dict):
+                return None, f'rates[{i}] must be an object'
+            try:
+                parsed, error = self._parse_rate_entry(entry)
+            except (KeyError, TypeError, ValueError) as e:
+                return None, f'rates[{i}]: invalid value ({e})'
+            if error:
+                return None, f'rates[{i}]: {error}'
+            entries.append(parsed)
+
+        return entries, None
+
+    def _parse_rate_entry(self, entry):
+        """One rate entry as (parsed, error)"""
+        rate_type = entry.get('rate_type', 'flat')
+        parsed = {
+            'zip_code': str(entry['zip_code']).strip() if entry.get('zip_code') else None,
+            'customer_type': entry.get('customer_type') or None,
+            'rate_type': rate_type,
+        }
+        if rate_type == 'flat':
+            if entry.get('flat_rate') is None:
+                return None, 'flat_rate is required for flat rates'
+            parsed['flat_rate'] = float(entry['flat_rate'])
+        elif rate_type == 'tiered':
+            tiers = entry.get('tiers') or []
+            if not tiers:
+                return None, 'tiers are required for tiered rates'
+            parsed['tier_min'] = np.array([float(t.get('tier_min') or 0) for t in tiers])
+            parsed['tier_max'] = np.array([
+                float(t['tier_max']) if t.get('tier_max') is not None else np.inf for t in tiers
+            ])
+            parsed['tier_rate'] = np.array([float(t['tier_rate']) for t in tiers])
+        else:
+            return None, 'rate_type must be flat or tiered'
+        return parsed, None
+
+    def _load_customers(self):
+        """Load customer attributes and their current effective rate"""
+        zip_rates, type_rates = self.billing_service._load_rate_tables()
+        rows = db.session.query(
+            Customer.id,
+            Customer.zip_code,
+            Customer.customer_type,
+            Customer.custom_rate_per_ccf,
+        ).all()
+
+        df = pd.DataFrame(rows, columns=['customer_id', 'zip_code', 'customer_type', 'custom_rate'])
+        df['current_rate'] = [
+            self.billing_service._resolve_rate_from_tables(
+                r.custom_rate, r.zip_code, r.customer_type, zip_rates, type_rates
+            )
+            for r in df.itertuples()
+        ]
+        df['has_custom_rate'] = df['custom_rate'].notna()
+        return df
+
+    def _load_monthly_usage(self, start_date, end_date):
+        """Monthly usage per customer from the monthly rollup (whole months touching the window)"""
+        rows = RollupService().monthly_usage(start_date, end_date)
+
+        df = pd.DataFrame(
+            [(r.customer_id, r.year, r.month, r.total_usage_ccf) for r in rows],
+            columns=['customer_id', 'year', 'month', 'usage_ccf']
+        )
+        df['usage_ccf'] = df['usage_ccf'].astype(float)
+        return df
+
+    def _match_entries(self, customers, entries):
+        """Assign each customer the index of the most specific matching rate entry (-1 = no match)"""
+        matched = pd.Series(-1, index=customers.index)
+        for level in MATCH_LEVELS:
+            level_entries = [
+                (idx, e) for idx, e in enumerate(entries)
+                if all(e[k] is not None for k in level)
+                and all(e[k] is None for k in ('zip_code', 'customer_type') if k not in level)
+            ]
+            if not level_entries:
+                continue
+
+            if level:
+                keys = pd.DataFrame(
+                    [{**{k: e[k] for k in level}, 'entry_idx': idx} for idx, e in level_entries]
+                ).drop_duplicates(subset=list(level), keep='last')
+                hits = customers[list(level)].merge(keys, on=list(level), how='left')['entry_idx']
+                hits.index = customers.index
+            else:
+                # Catch-all: the last one listed applies to everyone still unmatched
+                hits = pd.Series(level_entries[-1][0], index=customers.index)
+
+            unmatched = matched == -1
+            matched[unmatched & hits.notna()] = hits[unmatched & hits.notna()].astype(int)
+
+        return matched
+
+    def _apply_entry(self, entry, usage):
+        """Vectorized bill amounts for an array of monthly usage values"""
+        if entry['rate_type'] == 'flat':
+            return usage * entry['flat_rate']
+
+        widths = entry['tier_max'] - entry['tier_min']
+        in_tier = np.clip(usage[:, None] - entry['tier_min'][None, :], 0, widths[None, :])
+        return (in_tier * entry['tier_rate'][None, :]).sum(axis=1)
+
+    def _group_deltas(self, bills, key):
+        grouped = bills.groupby(key, dropna=False).agg(
+            customer_count=('customer_id', 'nunique'),
+            current_revenue=('current_amount', 'sum'),
+            projected_revenue=('projected_amount', 'sum'),
+        ).reset_index()
+
+        output = []
+        for r in grouped.itertuples(index=False):
+            current = float(r.current_revenue)
+            projected = float(r.projected_revenue)
+            output.append({
+                key: getattr(r, key) if pd.notna(getattr(r, key)) else None,
+                'customer_count': int(r.customer_count),
+                'current_revenue': round(current, 2),
+                'projected_revenue': round(projected, 2),
+                'revenue_delta': round(projected - current, 2),
+                'revenue_delta_pct': round((projected - current) / current * 100, 2) if current else None,
+            })
+        return output
+
+    def _change_distribution(self, per_customer):
+        """Summarize the distribution of per-customer average monthly bill changes"""
+        changes = per_customer['avg_monthly_change'].to_numpy()
+        if changes.size == 0:
+            return {'customer_count': 0}
+
+        counts, edges = np.histogram(changes, bins=20)
+        return {
+            'customer_count': int(changes.size),
+            'increased': int((changes > 0.005).sum()),
+            'decreased': int((changes < -0.005).sum()),
+            'unchanged': int((np.abs(changes) <= 0.005).sum()),
+            'mean': round(float(changes.mean()), 2),
+            'min': round(float(changes.min()), 2),
+            'max': round(float(changes.max()), 2),
+            'percentiles': {
+                f'p{p}': round(float(v), 2)
+                for p, v in zip(PERCENTILES, np.percentile(changes, PERCENTILES))
+            },
+            'histogram': [
+                {'from': round(float(edges[i]), 2), 'to': round(float(edges[i + 1]), 2), 'count': int(c)}
+                for i, c in enumerate(counts)
+            ],
+        }
+
+    def simulate(self, rates, start_date, end_date, keep_custom_rates=True):
+        """Project bills for every customer under a candidate rate table.
+
+        Bills are projected per customer per month from the monthly usage rollup
+        (calendar months touching the window), entirely in memory; nothing is
+        written. Customers with a per-customer override keep it unless
+        keep_custom_rates is False, and customers no entry matches keep their
+        current effective rate.
+
+        Invalid input is returned as {'error': ...}; anything else raises.
+        """
+        entries, error = self._parse_rate_table(rates)
+        if error:
+            return {'error': error}
+        if start_date > end_date:
+            return {'error': 'start_date must be before end_date'}
+        # Strings like "false" are truthy; only a real JSON boolean is accepted
+        if not isinstance(keep_custom_rates, bool):
+            return {'error': 'keep_custom_rates must be true or false'}
+
+        customers = self._load_customers()
+        monthly = self._load_monthly_usage(start_date, end_date)
+
+        if monthly.empty or customers.empty:
+            return {'error': 'No usage data in the requested window'}
+
+        customers['entry_idx'] = self._match_entries(customers, entries)
+        if keep_custom_rates:
+            customers.loc[customers['has_custom_rate'], 'entry_idx'] = -1
+
+        bills = monthly.merge(customers, on='customer_id', how='inner')
+        usage = bills['usage_ccf'].to_numpy()
+
+        bills['current_amount'] = usage * bills['current_rate'].to_numpy()
+        projected = bills['current_amount'].to_numpy().copy()
+        entry_idx = bills['entry_idx'].to_numpy()
+        for idx, entry in enumerate(entries):
+            mask = entry_idx == idx
+            if mask.any():
+                projected[mask] = self._apply_entry(entry, usage[mask])
+        bills['projected_amount'] = projected
+
+        per_customer = bills.groupby('customer_id').agg(
+            months=('usage_ccf', 'size'),
+            current_total=('current_amount', 'sum'),
+            projected_total=('projected_amount', 'sum'),
+        )
+        per_customer['avg_monthly_change'] = (
+            (per_customer['projected_total'] - per_customer['current_total']) / per_customer['months']
+        )
+
+        current_revenue = float(bills['current_amount'].sum())
+        projected_revenue = float(bills['projected_amount'].sum())
+
+        return {
+            'period': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat()
+            },
+            'totals': {
+                'customer_count': int(per_customer.shape[0]),
+                'bill_count': int(bills.shape[0]),
+                'customers_repriced': int(customers.loc[customers['entry_idx'] >= 0, 'customer_id']
+                                          .isin(per_customer.index).sum()),
+                'current_revenue': round(current_revenue, 2),
+                'projected_revenue': round(projected_revenue, 2),
+                'revenue_delta': round(projected_revenue - current_revenue, 2),
+                'revenue_delta_pct': round(
+                    (projected_revenue - current_revenue) / current_revenue * 100, 2
+                ) if current_revenue else None,
+            },
+            'by_zip_code': self._group_deltas(bills, 'zip_code'),
+            'by_customer_type': self._group_deltas(bills, 'customer_type'),
+            'bill_change_distribution': self._change_distribution(per_customer),
+        }
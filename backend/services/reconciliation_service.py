@@ -0,0 +1,193 @@
+"""
+Reconciliation Service - Verify stored bills against usage and effective rates
+"""
+
+import numpy as np
+import pandas as pd
+from database import db, Bill, Customer, WaterUsage
+from services.billing_service import BillingService, DEFAULT_RATE_PER_CCF
+from datetime import datetime
+from sqlalchemy import and_, func
+import os
+import time
+
+# Stored values are DECIMAL(10, 2); anything beyond rounding is a discrepancy
+TOLERANCE = 0.01
+
+
+class ReconciliationService:
+    JOB_NAME = 'reconcile_bills'
+
+    def __init__(self, report_dir=None, chunk_size=50000):
+        self.report_dir = report_dir or os.getenv('RECONCILIATION_REPORT_DIR', 'reconciliation_reports')
+        self.chunk_size = chunk_size
+        self.billing_service = BillingService()
+
+    def _fetch_chunk(self, after_id, start_date, end_date):
+        """Expected usage for a chunk of bills, computed in one grouped join"""
+        query = db.session.query(
+            Bill.id.label('bill_id'),
+            Bill.customer_id,
+            Bill.billing_period_start,
+            Bill.billing_period_end,
+            Bill.total_usage_ccf,
+            Bill.total_amount,
+            Bill.due_date,
+            Bill.status,
+            func.coalesce(func.sum(WaterUsage.daily_usage_ccf), 0).label('expected_usage_ccf'),
+        ).outerjoin(
+            WaterUsage,
+            and_(
+                WaterUsage.customer_id == Bill.customer_id,
+                WaterUsage.usage_date >= Bill.billing_period_start,
+                WaterUsage.usage_date <= Bill.billing_period_end
+            )
+        ).filter(Bill.id > after_id)
+
+        if start_date:
+            query = query.filter(Bill.billing_period_end >= start_date)
+        if end_date:
+            query = query.filter(Bill.billing_period_start <= end_date)
+
+        rows = query.group_by(Bill.id).order_by(Bill.id).limit(self.chunk_size).all()
+        df = pd.DataFrame(rows, columns=[
+            'bill_id', 'customer_id', 'billing_period_start', 'billing_period_end',
+            'total_usage_ccf', 'total_amount', 'due_date', 'status', 'expected_usage_ccf',
+        ])
+        for col in ('total_usage_ccf', 'total_amount', 'expected_usage_ccf'):
+            df[col] = df[col].astype(float)
+        return df
+
+    def _load_rates(self):
+        """Current effective rate per customer, resolved against preloaded rate tables.
+
+        Zip code and custom rates keep no history, so this is only the rate a
+        bill would get today; _diff prices bills at the rate they were billed at.
+        """
+        zip_rates, type_rates = self.billing_service._load_rate_tables()
+        rows = db.session.query(
+            Customer.id, Customer.zip_code, Customer.customer_type, Customer.custom_rate_per_ccf
+        ).all()
+        return pd.Series({
+            r.id: self.billing_service._resolve_rate_from_tables(
+                r.custom_rate_per_ccf, r.zip_code, r.customer_type, zip_rates, type_rates
+            )
+            for r in rows
+        }, dtype=float)
+
+    def _diff(self, df, rates):
+        """Vectorized comparison of stored vs expected values.
+
+        Only usage decides a discrepancy. Expected amounts use the rate the bill
+        was priced at (stored amount / stored usage), falling back to the current
+        rate for zero-usage bills, so a rate change does not flag or reprice
+        historical bills. How far each bill is from current pricing is kept as
+        information in current_rate_amount_delta.
+        """
+        df['current_rate_per_ccf'] = df['customer_id'].map(rates).fillna(DEFAULT_RATE_PER_CCF)
+        billed_rate = (df['total_amount'] / df['total_usage_ccf']).where(df['total_usage_ccf'] > 0)
+        df['rate_per_ccf'] = billed_rate.fillna(df['current_rate_per_ccf']).round(4)
+        df['expected_usage_ccf'] = df['expected_usage_ccf'].round(2)
+        df['expected_amount'] = (df['expected_usage_ccf'] * df['rate_per_ccf']).round(2)
+        df['usage_delta'] = (df['total_usage_ccf'] - df['expected_usage_ccf']).round(2)
+        df['amount_delta'] = (df['total_amount'] - df['expected_amount']).round(2)
+        df['current_rate_amount_delta'] = (
+            df['total_amount'] - df['total_usage_ccf'] * df['current_rate_per_ccf']
+        ).round(2)
+
+        usage_mismatch = np.abs(df['usage_delta']) > TOLERANCE
+        df['kind'] = np.where(usage_mismatch, 'usage', '')
+        return df[usage_mismatch]
+
+    def _count_repriced(self, df):
+        """Bills whose amount differs from what the current rate would charge"""
+        return int((np.abs(df['current_rate_amount_delta']) > TOLERANCE).sum())
+
+    def _rebill(self, discrepancies):
+        """Rewrite usage-discrepant bills at their billed rate; paid bills are left alone"""
+        to_fix = discrepancies[discrepancies['status'] != 'paid']
+        bills = [{
+            'customer_id': int(r.customer_id),
+            'billing_period_start': r.billing_period_start,
+            'billing_period_end': r.billing_period_end,
+            'total_usage_ccf': float(r.expected_usage_ccf),
+            'total_amount': float(r.expected_amount),
+            'due_date': r.due_date,
+        } for r in to_fix.itertuples(index=False)]
+        self.billing_service.upsert_bills(bills, refresh=True)
+        return len(bills)
+
+    def reconcile(self, start_date=None, end_date=None, rebill=False, sample_size=100):
+        """Reconcile all bills (optionally limited to a period window).
+
+        Writes the full discrepancy report as CSV and returns a summary with a
+        sample of discrepancies. With rebill=True unpaid bills whose usage is
+        wrong are corrected through the bulk upsert path, keeping their rate.
+        Bills priced at a rate other than today's are only counted.
+        """
+        started = time.perf_counter()
+        rates = self._load_rates()
+
+        checked = rebilled = other_rate = 0
+        after_id = 0
+        reports = []
+
+        while True:
+            chunk = self._fetch_chunk(after_id, start_date, end_date)
+            if chunk.empty:
+                break
+            after_id = int(chunk['bill_id'].iloc[-1])
+            checked += len(chunk)
+
+            discrepancies = self._diff(chunk, rates)
+            other_rate += self._count_repriced(chunk)
+            if not discrepancies.empty:
+                reports.append(discrepancies)
+                if rebill:
+                    rebilled += self._rebill(discrepancies)
+                    db.session.commit()
+
+            print(f"Reconciliation: {checked} bills checked")
+
+        columns = [
+            'bill_id', 'customer_id', 'billing_period_start', 'billing_period_end', 'status', 'kind',
+            'total_usage_ccf', 'expected_usage_ccf', 'usage_delta',
+            'rate_per_ccf', 'total_amount', 'expected_amount', 'amount_delta',
+            'current_rate_per_ccf', 'current_rate_amount_delta',
+        ]
+        report = pd.concat(reports)[columns] if reports else pd.DataFrame(columns=columns)
+
+        os.makedirs(self.report_dir, exist_ok=True)
+        report_path = os.path.join(
+            self.report_dir, f"reconciliation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        )
+        report.to_csv(report_path, index=False)
+
+        sample = report.head(sample_size).copy()
+        for col in ('billing_period_start', 'billing_period_end'):
+            sample[col] = sample[col].map(lambda d: d.isoformat())
+
+        return {
+            'bills_checked': checked,
+            'discrepancies': int(len(report)),
+            'usage_mismatches': int(len(report)),
+            'total_amount_delta': round(float(report['amount_delta'].sum()), 2) if len(report) else 0.0,
+            # Informational: not discrepancies and never rebilled
+            'priced_at_other_rate': other_rate,
+            'rebilled': rebilled,
+            'report_path': os.path.abspath(report_path),
+            'elapsed_seconds': round(time.perf_counter() - started, 2),
+            'sample': sample.to_dict(orient='records'),
+        }
+
+    def run(self, **kwargs):
+        """Reconcile and record the run as a job (the sample is not stored)"""
+        from services.job_service import JobService
+        result = {}
+
+        def reconcile_without_sample():
+            result.update(self.reconcile(**kwargs))
+            return {k: v for k, v in result.items() if k != 'sample'}
+
+        job_result = JobService().run(self.JOB_NAME, reconcile_without_sample)
+        return {**job_result, 'sample': result.get('sample', [])}
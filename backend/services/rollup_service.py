@@ -0,0 +1,338 @@
+"""
+Rollup Service - Pre-aggregated usage tables maintained on ingest
+"""
+
+from database import (
+    db, bulk_upsert, Customer, WaterUsage,
+    UsageMonthlyRollup, UsageDailySegmentRollup, UsageDailySystemRollup
+)
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, func, insert, literal, select, tuple_, union_all
+import time
+
+
+def month_start(d):
+    return d.replace(day=1)
+
+
+def month_end(d):
+    return d.replace(day=1) + relativedelta(months=1) - timedelta(days=1)
+
+
+class RollupService:
+    JOB_NAME = 'rebuild_rollups'
+
+    # ---- Incremental maintenance -------------------------------------------------
+
+    def record_usage(self, rows):
+        """Fold newly written usage rows into all rollups.
+
+        rows are dicts with customer_id, zip_code, customer_type, usage_date and
+        daily_usage_ccf. Call inside the transaction that writes the usage so the
+        rollups commit (or roll back) together with it.
+        """
+        if not rows:
+            return
+        now = datetime.utcnow()
+
+        monthly = {}
+        system = {}
+        for r in rows:
+            ccf = float(r['daily_usage_ccf'])
+            d = r['usage_date']
+
+            m = monthly.get((r['customer_id'], d.year, d.month))
+            if m is None:
+                m = monthly[(r['customer_id'], d.year, d.month)] = {
+                    'customer_id': r['customer_id'], 'year': d.year, 'month': d.month,
+                    'total_usage_ccf': 0.0, 'day_count': 0, 'max_daily_ccf': ccf,
+                    'first_usage_date': d, 'last_usage_date': d, 'updated_at': now,
+                }
+            m['total_usage_ccf'] += ccf
+            m['day_count'] += 1
+            m['max_daily_ccf'] = max(m['max_daily_ccf'], ccf)
+            m['first_usage_date'] = min(m['first_usage_date'], d)
+            m['last_usage_date'] = max(m['last_usage_date'], d)
+
+            s = system.setdefault(d, {'usage_date': d, 'total_usage_ccf': 0.0, 'reading_count': 0, 'updated_at': now})
+            s['total_usage_ccf'] += ccf
+            s['reading_count'] += 1
+
+        bulk_upsert(
+            UsageMonthlyRollup, list(monthly.values()),
+            key_columns=('customer_id', 'year', 'month'),
+            update_columns=('updated_at',),
+            increment_columns=('total_usage_ccf', 'day_count'),
+            max_columns=('max_daily_ccf', 'last_usage_date'),
+            min_columns=('first_usage_date',)
+        )
+        self._apply_segment_deltas(rows, sign=1, now=now)
+        bulk_upsert(
+            UsageDailySystemRollup, list(system.values()),
+            key_columns=('usage_date',),
+            update_columns=('updated_at',),
+            increment_columns=('total_usage_ccf', 'reading_count')
+        )
+
+    def _apply_segment_deltas(self, rows, sign, now):
+        segment = {}
+        for r in rows:
+            key = (r['usage_date'], r['zip_code'] or '', r['customer_type'] or 'Residential')
+            s = segment.get(key)
+            if s is None:
+                s = segment[key] = {
+                    'usage_date': key[0], 'zip_code': key[1], 'customer_type': key[2],
+                    'total_usage_ccf': 0.0, 'reading_count': 0, 'updated_at': now,
+                }
+            s['total_usage_ccf'] += sign * float(r['daily_usage_ccf'])
+            s['reading_count'] += sign
+
+        bulk_upsert(
+            UsageDailySegmentRollup, list(segment.values()),
+            key_columns=('usage_date', 'zip_code', 'customer_type'),
+            update_columns=('updated_at',),
+            increment_columns=('total_usage_ccf', 'reading_count')
+        )
+
+    def move_customer_segment(self, customer_id, old_zip, old_type, new_zip, new_type):
+        """Move a customer's history between zip/type segments after a profile change"""
+        if (old_zip or '') == (new_zip or '') and old_type == new_type:
+            return
+
+        usage = db.session.query(WaterUsage.usage_date, WaterUsage.daily_usage_ccf).filter(
+            WaterUsage.customer_id == customer_id
+        ).all()
+        now = datetime.utcnow()
+        self._apply_segment_deltas(
+            [{'usage_date': u.usage_date, 'daily_usage_ccf': u.daily_usage_ccf,
+              'zip_code': old_zip, 'customer_type': old_type} for u in usage],
+            sign=-1, now=now
+        )
+        self._apply_segment_deltas(
+            [{'usage_date': u.usage_date, 'daily_usage_ccf': u.daily_usage_ccf,
+              'zip_code': new_zip, 'customer_type': new_type} for u in usage],
+            sign=1, now=now
+        )
+
+    # ---- Rebuild -----------------------------------------------------------------
+
+    def _rebuild_month(self, first_day):
+        last_day = month_end(first_day)
+        now = datetime.utcnow()
+
+        db.session.execute(delete(UsageMonthlyRollup).where(
+            UsageMonthlyRollup.year == first_day.year, UsageMonthlyRollup.month == first_day.month
+        ))
+        db.session.execute(delete(UsageDailySegmentRollup).where(
+            UsageDailySegmentRollup.usage_date >= first_day, UsageDailySegmentRollup.usage_date <= last_day
+        ))
+        db.session.execute(delete(UsageDailySystemRollup).where(
+            UsageDailySystemRollup.usage_date >= first_day, UsageDailySystemRollup.usage_date <= last_day
+        ))
+
+        in_month = (WaterUsage.usage_date >= first_day, WaterUsage.usage_date <= last_day)
+
+        monthly = db.session.execute(insert(UsageMonthlyRollup).from_select(
+            ['customer_id', 'year', 'month', 'total_usage_ccf', 'day_count', 'max_daily_ccf',
+             'first_usage_date', 'last_usage_date', 'updated_at'],
+            select(
+                WaterUsage.customer_id, literal(first_day.year), literal(first_day.month),
+                func.sum(WaterUsage.daily_usage_ccf), func.count(WaterUsage.id),
+                func.max(WaterUsage.daily_usage_ccf), func.min(WaterUsage.usage_date),
+                func.max(WaterUsage.usage_date), literal(now)
+            ).where(*in_month).group_by(WaterUsage.customer_id)
+        ))
+
+        zip_code = func.coalesce(Customer.zip_code, '')
+        customer_type = func.coalesce(Customer.customer_type, 'Residential')
+        db.session.execute(insert(UsageDailySegmentRollup).from_select(
+            ['usage_date', 'zip_code', 'customer_type', 'total_usage_ccf', 'reading_count', 'updated_at'],
+            select(
+                WaterUsage.usage_date, zip_code, customer_type,
+                func.sum(WaterUsage.daily_usage_ccf), func.count(WaterUsage.id), literal(now)
+            ).join(Customer, Customer.id == WaterUsage.customer_id)
+            .where(*in_month).group_by(WaterUsage.usage_date, zip_code, customer_type)
+        ))
+
+        db.session.execute(insert(UsageDailySystemRollup).from_select(
+            ['usage_date', 'total_usage_ccf', 'reading_count', 'updated_at'],
+            select(
+                WaterUsage.usage_date, func.sum(WaterUsage.daily_usage_ccf),
+                func.count(WaterUsage.id), literal(now)
+            ).where(*in_month).group_by(WaterUsage.usage_date)
+        ))
+
+        db.session.commit()
+        return monthly.rowcount
+
+    def rebuild(self, start_date=None, end_date=None):
+        """Recompute rollups from raw usage, one calendar month per transaction.
+
+        Used for backfills and to repair drift (e.g. rows written outside the
+        import path). Without dates the whole usage history is rebuilt.
+        """
+        if start_date is None or end_date is None:
+            bounds = db.session.query(func.min(WaterUsage.usage_date), func.max(WaterUsage.usage_date)).one()
+            start_date = start_date or bounds[0]
+            end_date = end_date or bounds[1]
+        if start_date is None:
+            return {'months_rebuilt': 0, 'customer_months': 0}
+
+        started = time.perf_counter()
+        current = month_start(start_date)
+        months = customer_months = 0
+        while current <= end_date:
+            customer_months += self._rebuild_month(current)
+            months += 1
+            print(f"Rebuilt rollups for {current.year}-{current.month:02d}")
+            current = current + relativedelta(months=1)
+
+        return {
+            'start_date': month_start(start_date).isoformat(),
+            'end_date': month_end(end_date).isoformat(),
+            'months_rebuilt': months,
+            'customer_months': customer_months,
+            'elapsed_seconds': round(time.perf_counter() - started, 2),
+        }
+
+    def run_rebuild(self, start_date=None, end_date=None):
+        """Rebuild and record the run as a job"""
+        from services.job_service import JobService
+        return JobService().run(self.JOB_NAME, self.rebuild, start_date, end_date)
+
+    # ---- Reads -------------------------------------------------------------------
+
+    def _full_months(self, start_date, end_date):
+        """Whole calendar months inside [start_date, end_date] as (first_day, last_day).
+
+        None bounds are open-ended. Returns None when no whole month fits.
+        """
+        first = None
+        last = None
+        if start_date:
+            first = start_date if start_date.day == 1 else month_start(start_date) + relativedelta(months=1)
+        if end_date:
+            last = end_date if end_date == month_end(end_date) else month_start(end_date) - timedelta(days=1)
+        if first and last and first > last:
+            return None
+        return first, last
+
+    def _totals_parts(self, start_date, end_date, customer_ids):
+        """Per-customer partial totals: rollup rows for whole months plus raw edges"""
+        def raw(lo, hi):
+            q = select(
+                WaterUsage.customer_id,
+                func.sum(WaterUsage.daily_usage_ccf).label('total_usage'),
+                func.count(WaterUsage.id).label('record_count'),
+                func.max(WaterUsage.daily_usage_ccf).label('max_daily'),
+            )
+            if lo:
+                q = q.where(WaterUsage.usage_date >= lo)
+            if hi:
+                q = q.where(WaterUsage.usage_date <= hi)
+            if customer_ids is not None:
+                q = q.where(WaterUsage.customer_id.in_(customer_ids))
+            return q.group_by(WaterUsage.customer_id)
+
+        full = self._full_months(start_date, end_date)
+        if full is None:
+            return [raw(start_date, end_date)]
+
+        first, last = full
+        q = select(
+            UsageMonthlyRollup.customer_id,
+            UsageMonthlyRollup.total_usage_ccf.label('total_usage'),
+            UsageMonthlyRollup.day_count.label('record_count'),
+            UsageMonthlyRollup.max_daily_ccf.label('max_daily'),
+        )
+        if first:
+            q = q.where(tuple_(UsageMonthlyRollup.year, UsageMonthlyRollup.month) >= (first.year, first.month))
+        if last:
+            q = q.where(tuple_(UsageMonthlyRollup.year, UsageMonthlyRollup.month) <= (last.year, last.month))
+        if customer_ids is not None:
+            q = q.where(UsageMonthlyRollup.customer_id.in_(customer_ids))
+
+        parts = [q]
+        if start_date and first > start_date:
+            parts.append(raw(start_date, first - timedelta(days=1)))
+        if end_date and last < end_date:
+            parts.append(raw(last + timedelta(days=1), end_date))
+        return parts
+
+    def customer_totals(self, start_date=None, end_date=None, customer_ids=None, limit=None):
+        """Total usage, reading count and max daily usage per customer for a date window.
+
+        Whole months come from the monthly rollup and only the partial months at
+        either edge touch water_usage. Ordered by total usage, highest first.
+        """
+        parts = self._totals_parts(start_date, end_date, customer_ids)
+        combined = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+
+        total = func.sum(combined.c.total_usage)
+        query = db.session.query(
+            combined.c.customer_id,
+            total.label('total_usage'),
+            func.sum(combined.c.record_count).label('record_count'),
+            func.max(combined.c.max_daily).label('max_daily'),
+        ).group_by(combined.c.customer_id).order_by(total.desc())
+
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    def monthly_usage(self, start_date=None, end_date=None, customer_ids=None):
+        """Monthly rollup rows for every month touching [start_date, end_date]"""
+        query = db.session.query(
+            UsageMonthlyRollup.customer_id,
+            UsageMonthlyRollup.year,
+            UsageMonthlyRollup.month,
+            UsageMonthlyRollup.total_usage_ccf,
+            UsageMonthlyRollup.day_count,
+            UsageMonthlyRollup.last_usage_date,
+        )
+        if start_date:
+            query = query.filter(
+                tuple_(UsageMonthlyRollup.year, UsageMonthlyRollup.month) >= (start_date.year, start_date.month)
+            )
+        if end_date:
+            query = query.filter(
+                tuple_(UsageMonthlyRollup.year, UsageMonthlyRollup.month) <= (end_date.year, end_date.month)
+            )
+        if customer_ids is not None:
+            query = query.filter(UsageMonthlyRollup.customer_id.in_(customer_ids))
+        return query.all()
+
+    def system_daily(self, start_date=None, end_date=None):
+        """System-wide daily totals"""
+        query = db.session.query(
+            UsageDailySystemRollup.usage_date,
+            UsageDailySystemRollup.total_usage_ccf.label('total_usage'),
+            UsageDailySystemRollup.reading_count,
+        )
+        if start_date:
+            query = query.filter(UsageDailySystemRollup.usage_date >= start_date)
+        if end_date:
+            query = query.filter(UsageDailySystemRollup.usage_date <= end_date)
+        return query.order_by(UsageDailySystemRollup.usage_date).all()
+
+    def usage_stats(self):
+        """Record count and year range from the monthly rollup"""
+        row = db.session.query(
+            func.coalesce(func.sum(UsageMonthlyRollup.day_count), 0),
+            func.min(UsageMonthlyRollup.year),
+            func.max(UsageMonthlyRollup.year),
+        ).one()
+        return {'record_count': int(row[0]), 'min_year': row[1], 'max_year': row[2]}
+
+    def customer_version(self, customer_id):
+        """(version, last_modified) of one customer's usage, from the monthly rollup.
+
+        Every recorded reading bumps day_count or updated_at, so the pair
+        changes whenever the customer's usage does.
+        """
+        row = db.session.query(
+            func.coalesce(func.sum(UsageMonthlyRollup.day_count), 0),
+            func.max(UsageMonthlyRollup.updated_at),
+        ).filter(UsageMonthlyRollup.customer_id == customer_id).one()
+        return (int(row[0]), row[1]), row[1]
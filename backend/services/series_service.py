@@ -0,0 +1,161 @@
+"""
+Series Service - Downsampled usage time series for charts
+"""
+
+import numpy as np
+import pandas as pd
+from database import (
+    db, WaterUsage, UsageDailySegmentRollup, UsageDailySystemRollup
+)
+from datetime import timedelta
+from sqlalchemy import func, literal
+
+SCOPES = ['customer', 'zip_code', 'customer_type', 'system']
+# Weeks are labelled by their Monday, months by their first day
+RESOLUTIONS = {'day': None, 'week': 'W-MON', 'month': 'MS'}
+MAX_POINTS = 5000
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    selected = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+
+        ax, ay = x[selected], y[selected]
+        areas = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y - ay))
+        selected = lo + int(areas.argmax())
+        indices[i + 1] = selected
+
+    return indices
+
+
+class SeriesService:
+    def _daily_query(self, scope, value):
+        """Daily (usage_date, total_usage, reading_count) for a scope, cheapest source first"""
+        if scope == 'system':
+            return db.session.query(
+                UsageDailySystemRollup.usage_date,
+                UsageDailySystemRollup.total_usage_ccf.label('total_usage'),
+                UsageDailySystemRollup.reading_count,
+            ), UsageDailySystemRollup.usage_date
+
+        if scope in ('zip_code', 'customer_type'):
+            column = getattr(UsageDailySegmentRollup, scope)
+            return db.session.query(
+                UsageDailySegmentRollup.usage_date,
+                func.sum(UsageDailySegmentRollup.total_usage_ccf).label('total_usage'),
+                func.sum(UsageDailySegmentRollup.reading_count).label('reading_count'),
+            ).filter(column == value).group_by(
+                UsageDailySegmentRollup.usage_date
+            ), UsageDailySegmentRollup.usage_date
+
+        # A single customer has one reading per day; idx_customer_date serves the range
+        return db.session.query(
+            WaterUsage.usage_date,
+            WaterUsage.daily_usage_ccf.label('total_usage'),
+            literal(1).label('reading_count'),
+        ).filter(WaterUsage.customer_id == value), WaterUsage.usage_date
+
+    def _load_daily(self, scope, value, start_date, end_date):
+        query, date_column = self._daily_query(scope, value)
+        if start_date:
+            query = query.filter(date_column >= start_date)
+        if end_date:
+            query = query.filter(date_column <= end_date)
+
+        df = pd.DataFrame(
+            query.order_by(date_column).all(), columns=['usage_date', 'total_usage', 'reading_count']
+        )
+        df['usage_date'] = pd.to_datetime(df['usage_date'])
+        df['total_usage'] = df['total_usage'].astype(float)
+        df['reading_count'] = df['reading_count'].astype(int)
+        df['days'] = 1
+        return df
+
+    def _load_customer_monthly(self, customer_id, start_date, end_date):
+        """Customer month buckets straight from the monthly rollup"""
+        from services.rollup_service import RollupService
+        rows = RollupService().monthly_usage(start_date, end_date, customer_ids=[customer_id])
+        df = pd.DataFrame(
+            [(r.year, r.month, r.total_usage_ccf, r.day_count) for r in rows],
+            columns=['year', 'month', 'total_usage', 'reading_count']
+        )
+        df['usage_date'] = pd.to_datetime(dict(year=df['year'], month=df['month'], day=1))
+        df['total_usage'] = df['total_usage'].astype(float)
+        df['reading_count'] = df['reading_count'].astype(int)
+        df['days'] = df['reading_count']
+        return df.sort_values('usage_date')[['usage_date', 'total_usage', 'reading_count', 'days']]
+
+    def _resample(self, df, resolution):
+        rule = RESOLUTIONS[resolution]
+        if rule is None or df.empty:
+            return df
+        buckets = df.set_index('usage_date').resample(rule, label='left', closed='left')
+        out = buckets[['total_usage', 'reading_count', 'days']].sum().reset_index()
+        return out[out['days'] > 0]
+
+    def series(self, scope, value=None, start_date=None, end_date=None, resolution='day', points=None):
+        """Usage series for a customer, zip code, customer type or the whole system.
+
+        Either resampled to day/week/month buckets, or (with points) reduced from
+        the daily series to at most that many points with LTTB. Month buckets of
+        a partially covered month only include the days inside the window.
+        """
+        if scope not in SCOPES:
+            return {'error': f"scope must be one of: {', '.join(SCOPES)}"}
+        if resolution not in RESOLUTIONS:
+            return {'error': f"resolution must be one of: {', '.join(RESOLUTIONS)}"}
+        if scope != 'system' and value in (None, ''):
+            return {'error': f'{scope} is required for {scope} scope'}
+        if points is not None and not 3 <= points <= MAX_POINTS:
+            return {'error': f'points must be between 3 and {MAX_POINTS}'}
+
+        whole_months = (
+            start_date is None or start_date.day == 1
+        ) and (
+            end_date is None or (end_date + timedelta(days=1)).day == 1
+        )
+        if scope == 'customer' and resolution == 'month' and points is None and whole_months:
+            df = self._load_customer_monthly(value, start_date, end_date)
+        else:
+            df = self._load_daily(scope, value, start_date, end_date)
+            if points is not None:
+                resolution = 'lttb'
+                x = df['usage_date'].to_numpy().astype('datetime64[D]').astype(float)
+                df = df.iloc[lttb(x, df['total_usage'].to_numpy(), points)]
+            else:
+                df = self._resample(df, resolution)
+
+        return {
+            'scope': scope,
+            'value': value,
+            'resolution': resolution,
+            'period': {
+                'start_date': start_date.isoformat() if start_date else None,
+                'end_date': end_date.isoformat() if end_date else None
+            },
+            'points': [
+                {
+                    'date': r.usage_date.date().isoformat(),
+                    'total_usage_ccf': round(float(r.total_usage), 2),
+                    'avg_daily_ccf': round(float(r.total_usage) / r.days, 2),
+                    'reading_count': int(r.reading_count),
+                }
+                for r in df.itertuples(index=False)
+            ],
+            'count': int(len(df))
+        }
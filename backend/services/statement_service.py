@@ -0,0 +1,253 @@
+"""
+Statement Service - Batch rendering of bill statements
+"""
+
+from database import db, Bill, Customer, WaterUsage
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+import hashlib
+import json
+import os
+import time
+
+# Bump when the template changes so every statement is re-rendered
+TEMPLATE_VERSION = 'statement_html_v1'
+
+
+def _sparkline(values, width=560, height=80):
+    """Inline SVG bar chart of daily usage"""
+    if not values:
+        return ''
+    peak = max(values) or 1
+    bar_width = width / len(values)
+    bars = ''.join(
+        f'<rect x="{i * bar_width:.1f}" y="{height - v / peak * height:.1f}" '
+        f'width="{max(bar_width - 1, 1):.1f}" height="{v / peak * height:.1f}" fill="#1d7fb8"/>'
+        for i, v in enumerate(values)
+    )
+    return f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">{bars}</svg>'
+
+
+def render_statement_html(payload):
+    """Render one statement as a standalone HTML document"""
+    bill = payload['bill']
+    customer = payload['customer']
+    usage = payload['usage']
+
+    rows = ''.join(
+        f'<tr><td>{escape(d)}</td><td class="num">{v:.2f}</td></tr>' for d, v in usage
+    )
+    name = escape(customer['business_name'] or customer['customer_name'] or '')
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>HydroSpark Statement #{bill['id']}</title>
+<style>
+body {{ font-family: Arial, sans-serif; color: #1f2937; margin: 40px; }}
+h1 {{ color: #0b4f6c; }}
+table {{ border-collapse: collapse; }}
+td, th {{ padding: 4px 12px; border-bottom: 1px solid #e5e7eb; text-align: left; }}
+.num {{ text-align: right; }}
+.total {{ font-size: 1.4em; font-weight: bold; }}
+</style>
+</head>
+<body>
+<h1>HydroSpark Water Statement</h1>
+<p>{name}<br>{escape(customer['mailing_address'] or '')}<br>{escape(customer['zip_code'] or '')}</p>
+<p>Location ID: {escape(customer['location_id'] or '')} &middot; Account type: {escape(customer['customer_type'] or '')}</p>
+<table>
+<tr><th>Statement #</th><td>{bill['id']}</td></tr>
+<tr><th>Billing period</th><td>{bill['billing_period_start']} &ndash; {bill['billing_period_end']}</td></tr>
+<tr><th>Total usage</th><td>{bill['total_usage_ccf']:.2f} CCF</td></tr>
+<tr><th>Due date</th><td>{bill['due_date']}</td></tr>
+<tr><th>Status</th><td>{escape(bill['status'] or '')}</td></tr>
+</table>
+<p class="total">Amount due: ${bill['total_amount']:,.2f}</p>
+<h2>Daily usage</h2>
+{_sparkline([v for _, v in usage])}
+<table>
+<tr><th>Date</th><th class="num">CCF</th></tr>
+{rows}
+</table>
+</body>
+</html>
+"""
+
+
+def statement_path(output_dir, digest):
+    """Content-addressed location of a rendered statement"""
+    return os.path.join(output_dir, digest[:2], f'{digest}.html')
+
+
+def _render_and_write(job):
+    """Process pool worker: render one statement and write it under its digest.
+
+    Returns (bill id, bytes written), with None for bytes when an identical
+    statement was already on disk and force was not set.
+    """
+    output_dir, digest, payload, force = job
+    path = statement_path(output_dir, digest)
+    if os.path.exists(path) and not force:
+        return payload['bill']['id'], None
+    html = render_statement_html(payload).encode('utf-8')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+    return payload['bill']['id'], len(html)
+
+
+class StatementService:
+    JOB_NAME = 'render_statements'
+
+    def __init__(self, output_dir=None, workers=None, chunk_size=1000):
+        self.output_dir = output_dir or os.getenv('STATEMENT_OUTPUT_DIR', 'statements')
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.manifest_path = os.path.join(self.output_dir, 'manifest.json')
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _fetch_chunk(self, after_id, filters):
+        """Next chunk of bills (keyset on id) joined to their customers"""
+        query = db.session.query(
+            Bill.id, Bill.customer_id, Bill.billing_period_start, Bill.billing_period_end,
+            Bill.total_usage_ccf, Bill.total_amount, Bill.due_date, Bill.status,
+            Customer.customer_name, Customer.business_name, Customer.mailing_address,
+            Customer.zip_code, Customer.location_id, Customer.customer_type,
+        ).join(Customer, Customer.id == Bill.customer_id).filter(Bill.id > after_id)
+
+        if filters.get('start_date'):
+            query = query.filter(Bill.billing_period_end >= filters['start_date'])
+        if filters.get('end_date'):
+            query = query.filter(Bill.billing_period_start <= filters['end_date'])
+        if filters.get('customer_id'):
+            query = query.filter(Bill.customer_id == filters['customer_id'])
+
+        return query.order_by(Bill.id).limit(self.chunk_size).all()
+
+    def _fetch_usage(self, bills):
+        """Daily usage for every bill in the chunk with one range query"""
+        customer_ids = {b.customer_id for b in bills}
+        start = min(b.billing_period_start for b in bills)
+        end = max(b.billing_period_end for b in bills)
+
+        rows = db.session.query(
+            WaterUsage.customer_id, WaterUsage.usage_date, WaterUsage.daily_usage_ccf
+        ).filter(
+            WaterUsage.customer_id.in_(customer_ids),
+            WaterUsage.usage_date >= start,
+            WaterUsage.usage_date <= end
+        ).order_by(WaterUsage.customer_id, WaterUsage.usage_date).all()
+
+        series = {}
+        for r in rows:
+            series.setdefault(r.customer_id, []).append((r.usage_date, float(r.daily_usage_ccf)))
+        return series
+
+    def _payload(self, bill, series):
+        usage = [
+            (d.isoformat(), v) for d, v in series.get(bill.customer_id, [])
+            if bill.billing_period_start <= d <= bill.billing_period_end
+        ]
+        return {
+            'bill': {
+                'id': bill.id,
+                'billing_period_start': bill.billing_period_start.isoformat(),
+                'billing_period_end': bill.billing_period_end.isoformat(),
+                'total_usage_ccf': float(bill.total_usage_ccf),
+                'total_amount': float(bill.total_amount),
+                'due_date': bill.due_date.isoformat(),
+                'status': bill.status,
+            },
+            'customer': {
+                'customer_name': bill.customer_name,
+                'business_name': bill.business_name,
+                'mailing_address': bill.mailing_address,
+                'zip_code': bill.zip_code,
+                'location_id': bill.location_id,
+                'customer_type': bill.customer_type,
+            },
+            'usage': usage,
+        }
+
+    def _digest(self, payload):
+        content = json.dumps(payload, sort_keys=True) + TEMPLATE_VERSION
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def render_statements(self, start_date=None, end_date=None, customer_id=None, force=False):
+        """Render statements for all matching bills.
+
+        Bills and their usage are pulled in chunks; statements whose input digest
+        matches the manifest, or whose file already exists, are skipped, the rest
+        are rendered in a process pool and written to
+        <output_dir>/<digest[:2]>/<digest>.html. force re-renders and overwrites
+        every statement.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = {} if force else self._load_manifest()
+        filters = {'start_date': start_date, 'end_date': end_date, 'customer_id': customer_id}
+
+        started = time.perf_counter()
+        seen = rendered = skipped = bytes_written = 0
+        after_id = 0
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                bills = self._fetch_chunk(after_id, filters)
+                if not bills:
+                    break
+                after_id = bills[-1].id
+                seen += len(bills)
+
+                series = self._fetch_usage(bills)
+                jobs = []
+                for bill in bills:
+                    payload = self._payload(bill, series)
+                    digest = self._digest(payload)
+                    if manifest.get(str(bill.id)) == digest and \
+                            os.path.exists(statement_path(self.output_dir, digest)):
+                        skipped += 1
+                        continue
+                    manifest[str(bill.id)] = digest
+                    jobs.append((self.output_dir, digest, payload, force))
+
+                for _, size in pool.map(_render_and_write, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))):
+                    if size is None:  # same content already on disk
+                        skipped += 1
+                        continue
+                    rendered += 1
+                    bytes_written += size
+
+                self._save_manifest(manifest)
+                print(f"Statements: {seen} bills processed, {rendered} rendered, {skipped} unchanged")
+
+        elapsed = time.perf_counter() - started
+        return {
+            'output_dir': os.path.abspath(self.output_dir),
+            'bills_processed': seen,
+            'rendered': rendered,
+            'skipped_unchanged': skipped,
+            'bytes_written': bytes_written,
+            'workers': self.workers,
+            'elapsed_seconds': round(elapsed, 2),
+            'bills_per_second': round(seen / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    def run(self, **kwargs):
+        """Render statements and record the run as a job"""
+        from services.job_service import JobService
+        return JobService().run(self.JOB_NAME, self.render_statements, **kwargs)
@@ -0,0 +1,141 @@
+"""
+Stats Service - Admin dashboard counters maintained on write
+"""
+
+from database import db, bulk_upsert, Customer, SystemStats, WaterUsage
+from datetime import datetime
+from sqlalchemy import func, update
+
+STATS_ID = 1
+
+# Set once this process has seen the counters row; it is never deleted
+_row_exists = False
+
+
+class StatsService:
+    JOB_NAME = 'recount_stats'
+
+    def _ensure_row(self):
+        """Create the counters row from an exact count if it is missing.
+
+        Runs in the caller's transaction after flushing, so the count already
+        includes the caller's own writes. Returns True if the row was just created.
+        """
+        global _row_exists
+        if _row_exists:
+            return False
+        if db.session.query(SystemStats.id).filter(SystemStats.id == STATS_ID).first() is not None:
+            _row_exists = True
+            return False
+
+        db.session.flush()
+        now = datetime.utcnow()
+        # Another worker may seed it first; its row wins and the next recount fixes any drift
+        bulk_upsert(SystemStats, [{'id': STATS_ID, **self._exact_counts(), 'recounted_at': now, 'updated_at': now}], ['id'])
+        _row_exists = True
+        return True
+
+    def _apply(self, usage_records=0, customers=0, unique_names=0, min_year=None, max_year=None):
+        """Add deltas to the counters row in one upsert (joins the caller's transaction)"""
+        if self._ensure_row():
+            return
+        row = {
+            'id': STATS_ID,
+            'usage_record_count': usage_records,
+            'customer_count': customers,
+            'unique_customer_names': unique_names,
+            'updated_at': datetime.utcnow(),
+        }
+        min_max = {}
+        if min_year is not None:
+            row.update(min_usage_year=min_year, max_usage_year=max_year)
+            min_max = {'min_columns': ['min_usage_year'], 'max_columns': ['max_usage_year']}
+
+        bulk_upsert(
+            SystemStats, [row], ['id'],
+            update_columns=['updated_at'],
+            increment_columns=['usage_record_count', 'customer_count', 'unique_customer_names'],
+            **min_max
+        )
+
+    def _is_only_holder(self, name, customer_id):
+        """True if no other customer has this name (served by idx_customer_name)"""
+        return db.session.query(Customer.id).filter(
+            Customer.customer_name == name, Customer.id != customer_id
+        ).first() is None
+
+    def record_usage(self, rows):
+        """Count newly inserted usage rows (dicts with a usage_date)"""
+        if not rows:
+            return
+        years = [r['usage_date'].year for r in rows]
+        self._apply(usage_records=len(rows), min_year=min(years), max_year=max(years))
+
+    def record_customer(self, customer):
+        """Count a newly flushed customer, and its name if no one else has it"""
+        self._apply(customers=1, unique_names=int(self._is_only_holder(customer.customer_name, customer.id)))
+
+    def record_rename(self, customer_id, old_name, new_name):
+        """Adjust the distinct-name count when a customer's name changes (call after flush)"""
+        if old_name == new_name:
+            return
+        delta = int(self._is_only_holder(new_name, customer_id)) - int(self._is_only_holder(old_name, customer_id))
+        if delta:
+            self._apply(unique_names=delta)
+
+    def get_stats(self):
+        """Current counters; the first call on an empty table does an exact recount"""
+        stats = SystemStats.query.get(STATS_ID)
+        if stats is None:
+            self.recount()
+            stats = SystemStats.query.get(STATS_ID)
+        return stats.to_dict()
+
+    def _exact_counts(self):
+        usage = db.session.query(
+            func.count(WaterUsage.id), func.min(WaterUsage.year), func.max(WaterUsage.year)
+        ).one()
+        customers = db.session.query(
+            func.count(Customer.id), func.count(func.distinct(Customer.customer_name))
+        ).one()
+        return {
+            'usage_record_count': int(usage[0]),
+            'customer_count': int(customers[0]),
+            'unique_customer_names': int(customers[1]),
+            'min_usage_year': usage[1],
+            'max_usage_year': usage[2],
+        }
+
+    def recount(self):
+        """Recompute every counter exactly and overwrite the stored values"""
+        exact = self._exact_counts()
+        previous = SystemStats.query.get(STATS_ID)
+        drift = {
+            k: v - (getattr(previous, k) or 0)
+            for k, v in exact.items() if k.endswith('count') or k.endswith('names')
+        } if previous else None
+
+        now = datetime.utcnow()
+        if previous:
+            db.session.execute(
+                update(SystemStats).where(SystemStats.id == STATS_ID)
+                .values(**exact, recounted_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            db.session.add(SystemStats(id=STATS_ID, **exact, recounted_at=now, updated_at=now))
+        db.session.commit()
+
+        return {
+            'record_count': exact['usage_record_count'],
+            'customer_count': exact['customer_count'],
+            'unique_customer_names': exact['unique_customer_names'],
+            'min_year': exact['min_usage_year'],
+            'max_year': exact['max_usage_year'],
+            'drift': drift,
+        }
+
+    def run_recount(self):
+        """Recount and record the run as a job"""
+        from services.job_service import JobService
+        return JobService().run(self.JOB_NAME, self.recount)
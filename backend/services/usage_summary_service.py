@@ -0,0 +1,73 @@
+"""
+Usage Summary Service - Period usage totals and estimated cost for a customer
+"""
+
+from cache import TTLCache
+from database import data_versions
+from services.billing_service import BillingService
+from services.rollup_service import RollupService
+import os
+
+# Keyed by (customer_id, start_date, end_date, usage version, rates version).
+# The versions are read from the database, so a change made by another worker
+# or a CLI job misses the cache everywhere; invalidating only frees memory early.
+summary_cache = TTLCache(ttl=int(os.getenv('USAGE_SUMMARY_CACHE_TTL', '300')))
+
+
+def invalidate_customer_summaries(customer_ids):
+    """Drop cached summaries after a customer's usage or rate changes"""
+    customer_ids = set(customer_ids)
+    summary_cache.delete_where(lambda key: key[0] in customer_ids)
+
+
+def invalidate_all_summaries():
+    """Drop every cached summary (zip code or customer-type rate changes)"""
+    summary_cache.clear()
+
+
+class UsageSummaryService:
+    def summarize(self, customer, start_date, end_date):
+        """Total, average and peak daily usage plus estimated cost.
+
+        One query: whole months come from the monthly rollup and only the partial
+        months at either edge are aggregated from water_usage. Results are cached
+        per customer and range until that customer's usage or rate changes.
+        """
+        rollup_service = RollupService()
+        usage_version, _ = rollup_service.customer_version(customer.id)
+        # Custom rates live on customers; zip and customer-type rates in their tables
+        rates_version, _ = data_versions('customers', 'zip_code_rates', 'billing_rates')
+        key = (customer.id, start_date, end_date, usage_version, rates_version)
+        cached = summary_cache.get(key)
+        if cached is not None:
+            return cached
+
+        totals = rollup_service.customer_totals(start_date, end_date, customer_ids=[customer.id])
+        total_usage = float(totals[0].total_usage) if totals else 0.0
+        record_count = int(totals[0].record_count) if totals else 0
+        max_daily = float(totals[0].max_daily) if totals else 0.0
+        rate_per_ccf = BillingService()._resolve_rate(customer)
+
+        result = self._result(start_date, end_date, total_usage, record_count, max_daily, rate_per_ccf)
+        summary_cache.set(key, result)
+        return result
+
+    def empty_summary(self, start_date, end_date):
+        """Zero usage and no rate, for a customer_id with no customer behind it"""
+        return self._result(start_date, end_date, 0.0, 0, 0.0, None)
+
+    def _result(self, start_date, end_date, total_usage, record_count, max_daily, rate_per_ccf):
+        return {
+            'period': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat()
+            },
+            'summary': {
+                'total_usage_ccf': total_usage,
+                'average_daily_ccf': total_usage / record_count if record_count else 0.0,
+                'max_daily_ccf': max_daily,
+                'days_count': (end_date - start_date).days + 1,
+                'rate_per_ccf': rate_per_ccf,
+                'estimated_cost': total_usage * rate_per_ccf if rate_per_ccf is not None else None
+            }
+        }
@@ -0,0 +1,50 @@
+from datetime import date
+
+import pytest
+
+from app import create_app
+from database import db, Bill, Customer, User
+from services.billing_service import BillingService
+
+PERIOD = {'billing_period_start': date(2024, 1, 1), 'billing_period_end': date(2024, 1, 31)}
+
+
+@pytest.fixture
+def app():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_ENGINE_OPTIONS': {}})
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[User.__table__, Customer.__table__, Bill.__table__])
+        user = User(email='c@example.com', password_hash='x', role='customer')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Customer(id=1, user_id=user.id, customer_name='C', customer_type='Residential'))
+        db.session.commit()
+        yield app
+
+
+def _bill(amount, **kwargs):
+    return {'customer_id': 1, **PERIOD, 'total_usage_ccf': amount, 'total_amount': amount,
+            'due_date': date(2024, 2, 15), **kwargs}
+
+
+def test_refresh_rewrites_unpaid_bill(app):
+    BillingService().upsert_bills([_bill(10)])
+    BillingService().upsert_bills([_bill(20)], refresh=True)
+    db.session.commit()
+    assert float(Bill.query.one().total_amount) == 20
+
+
+def test_refresh_leaves_paid_bill_alone(app):
+    BillingService().upsert_bills([_bill(10, status='paid')])
+    BillingService().upsert_bills([_bill(20)], refresh=True)
+    db.session.commit()
+    bill = Bill.query.one()
+    assert float(bill.total_amount) == 10
+    assert bill.status == 'paid'
+
+
+def test_insert_only_keeps_existing_bill(app):
+    BillingService().upsert_bills([_bill(10)])
+    BillingService().upsert_bills([_bill(20)])
+    db.session.commit()
+    assert float(Bill.query.one().total_amount) == 10
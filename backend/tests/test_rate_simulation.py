@@ -0,0 +1,55 @@
+from datetime import date
+
+import pandas as pd
+
+from services.rate_simulation_service import RateSimulationService
+
+
+def _customers():
+    return pd.DataFrame({
+        'customer_id': [1, 2, 3, 4],
+        'zip_code': ['75001', '75001', '75002', '75003'],
+        'customer_type': ['Residential', 'Commercial', 'Residential', 'Municipal'],
+    })
+
+
+def _entries(rates):
+    entries, error = RateSimulationService()._parse_rate_table(rates)
+    assert error is None
+    return entries
+
+
+def test_catch_all_entry_matches_everyone_left():
+    entries = _entries([
+        {'zip_code': '75001', 'customer_type': 'Residential', 'flat_rate': 1},
+        {'customer_type': 'Commercial', 'flat_rate': 2},
+        {'flat_rate': 3},
+    ])
+    matched = RateSimulationService()._match_entries(_customers(), entries)
+    assert matched.tolist() == [0, 1, 2, 2]
+
+
+def test_last_catch_all_entry_wins():
+    entries = _entries([{'flat_rate': 3}, {'zip_code': '75002', 'flat_rate': 4}, {'flat_rate': 5}])
+    matched = RateSimulationService()._match_entries(_customers(), entries)
+    assert matched.tolist() == [2, 2, 1, 2]
+
+
+def test_no_catch_all_leaves_unmatched_customers():
+    entries = _entries([{'zip_code': '75003', 'flat_rate': 1}])
+    matched = RateSimulationService()._match_entries(_customers(), entries)
+    assert matched.tolist() == [-1, -1, -1, 0]
+
+
+def test_invalid_entries_are_validation_errors():
+    service = RateSimulationService()
+    assert service._parse_rate_table([{'flat_rate': 'abc'}])[1].startswith('rates[0]: invalid value')
+    assert service._parse_rate_table(['x'])[1] == 'rates[0] must be an object'
+    assert service._parse_rate_table([{'rate_type': 'tiered', 'tiers': [{}]}])[1].startswith('rates[0]: invalid value')
+
+
+def test_keep_custom_rates_must_be_boolean():
+    service = RateSimulationService()
+    for value in ('false', 0, None):
+        result = service.simulate([{'flat_rate': 1}], date(2024, 1, 1), date(2024, 1, 31), keep_custom_rates=value)
+        assert result == {'error': 'keep_custom_rates must be true or false'}
@@ -0,0 +1,36 @@
+from datetime import date
+
+import pandas as pd
+
+from services.reconciliation_service import ReconciliationService
+
+
+def _bills(rows):
+    return pd.DataFrame([{
+        'bill_id': i, 'customer_id': 1,
+        'billing_period_start': date(2023, 1, 1), 'billing_period_end': date(2023, 1, 31),
+        'due_date': date(2023, 2, 15), 'status': 'pending', **row,
+    } for i, row in enumerate(rows, start=1)])
+
+
+def test_rate_change_is_not_a_discrepancy():
+    # Billed at 5.00 before the rate went to 6.00
+    df = _bills([{'total_usage_ccf': 10.0, 'total_amount': 50.0, 'expected_usage_ccf': 10.0}])
+    service = ReconciliationService()
+    discrepancies = service._diff(df, pd.Series({1: 6.0}))
+    assert discrepancies.empty
+    assert service._count_repriced(df) == 1
+    assert df['current_rate_amount_delta'].tolist() == [-10.0]
+
+
+def test_usage_mismatch_keeps_billed_rate():
+    df = _bills([{'total_usage_ccf': 10.0, 'total_amount': 50.0, 'expected_usage_ccf': 12.0}])
+    discrepancies = ReconciliationService()._diff(df, pd.Series({1: 6.0}))
+    assert discrepancies['kind'].tolist() == ['usage']
+    assert discrepancies['expected_amount'].tolist() == [60.0]
+
+
+def test_zero_usage_bill_uses_current_rate():
+    df = _bills([{'total_usage_ccf': 0.0, 'total_amount': 0.0, 'expected_usage_ccf': 2.0}])
+    discrepancies = ReconciliationService()._diff(df, pd.Series({1: 6.0}))
+    assert discrepancies['expected_amount'].tolist() == [12.0]
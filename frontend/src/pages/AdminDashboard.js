@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { importData, getAdminCharges, setCustomerRate, getZipRates, createZipRate, updateZipRate, deleteZipRate, getZipAnalytics } from '../services/api';
+import { importData, getAdminCharges, getCustomerCharges, setCustomerRate, getZipRates, createZipRate, updateZipRate, deleteZipRate, getZipAnalytics } from '../services/api';
 import axios from 'axios';
 
 function AdminDashboard() {
@@ -12,9 +12,10 @@ function AdminDashboard() {
   const [billResult, setBillResult] = useState(null);
   const [error, setError] = useState(null);
   const [charges, setCharges] = useState([]);
-  const [chargesLoading, setChargesLoading] = useState(false);
+  const [chargesLoading, setChargesLoading] = useState(true);
   const [chargesError, setChargesError] = useState(null);
   const [expandedCustomer, setExpandedCustomer] = useState(null);
+  const [customerBills, setCustomerBills] = useState({});
   const [chargesSearch, setChargesSearch] = useState('');
 
   // Per-customer rate editing
@@ -35,20 +36,30 @@ function AdminDashboard() {
   const [zipAnalyticsSearch, setZipAnalyticsSearch] = useState('');
   const [expandedZip, setExpandedZip] = useState(null);
 
+  // Top 3 by amount, or every match for the search term, sorted server-side
+  const chargesParams = (search) => ({
+    search: search || undefined,
+    sort: 'total_amount',
+    order: 'desc',
+    per_page: search ? 100 : 3,
+  });
+
   useEffect(() => {
-    const fetchCharges = async () => {
-      setChargesLoading(true);
+    const timer = setTimeout(async () => {
       setChargesError(null);
       try {
-        const response = await getAdminCharges();
+        const response = await getAdminCharges(chargesParams(chargesSearch));
         setCharges(response.data.customers);
       } catch (err) {
         setChargesError(err.response?.data?.error || 'Failed to load charges');
       } finally {
         setChargesLoading(false);
       }
-    };
+    }, chargesSearch ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [chargesSearch]); // eslint-disable-line react-hooks/exhaustive-deps
 
+  useEffect(() => {
     const fetchZipRates = async () => {
       setZipRatesLoading(true);
       try {
@@ -73,11 +84,24 @@ function AdminDashboard() {
       }
     };
 
-    fetchCharges();
     fetchZipRates();
     fetchZipAnalytics();
   }, []);
 
+  const toggleCustomerBills = async (customerId) => {
+    if (expandedCustomer === customerId) {
+      setExpandedCustomer(null);
+      return;
+    }
+    setExpandedCustomer(customerId);
+    try {
+      const response = await getCustomerCharges(customerId);
+      setCustomerBills((prev) => ({ ...prev, [customerId]: response.data.bills }));
+    } catch (err) {
+      setChargesError(err.response?.data?.error || 'Failed to load bills');
+    }
+  };
+
   const openRateEditor = (customer) => {
     setEditingRateFor(customer.customer_id);
     setRateEditValues({
@@ -94,7 +118,7 @@ function AdminDashboard() {
         zip_code: rateEditValues.zip_code,
       };
       await setCustomerRate(customerId, payload);
-      const response = await getAdminCharges();
+      const response = await getAdminCharges(chargesParams(chargesSearch));
       setCharges(response.data.customers);
       setEditingRateFor(null);
     } catch (err) {
@@ -345,6 +369,7 @@ function AdminDashboard() {
               <p className="font-semibold">{billResult.message}</p>
               <p className="text-sm mt-1">
                 Generated {billResult.total_bills} bills
+                {billResult.skipped_existing > 0 && ` (${billResult.skipped_existing} periods already billed)`}
               </p>
             </div>
           )}
@@ -423,15 +448,7 @@ function AdminDashboard() {
                   </tr>
                 </thead>
                 <tbody>
-                  {(() => {
-                    const q = chargesSearch.toLowerCase();
-                    const sorted = [...charges].sort((a, b) => b.total_amount - a.total_amount);
-                    if (!q) return sorted.slice(0, 3);
-                    return sorted.filter((c) =>
-                      (c.customer_name || '').toLowerCase().includes(q) ||
-                      (c.email || '').toLowerCase().includes(q)
-                    );
-                  })()
+                  {charges
                     .map((customer) => (
                       <>
                         <tr
@@ -487,11 +504,7 @@ function AdminDashboard() {
                               Set Rate
                             </button>
                             <button
-                              onClick={() =>
-                                setExpandedCustomer(
-                                  expandedCustomer === customer.customer_id ? null : customer.customer_id
-                                )
-                              }
+                              onClick={() => toggleCustomerBills(customer.customer_id)}
                               className="text-gray-400 text-xs"
                             >
                               {expandedCustomer === customer.customer_id ? '▲' : '▼'}
@@ -560,7 +573,10 @@ function AdminDashboard() {
                                   </tr>
                                 </thead>
                                 <tbody>
-                                  {customer.bills.map((bill) => {
+                                  {!customerBills[customer.customer_id] && (
+                                    <tr><td colSpan={6} className="py-2 text-gray-500">Loading bills...</td></tr>
+                                  )}
+                                  {(customerBills[customer.customer_id] || []).map((bill) => {
                                     const usage = parseFloat(bill.total_usage_ccf);
                                     const cost = parseFloat(bill.total_amount);
                                     const rate = usage > 0 ? (cost / usage).toFixed(2) : '—';
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
-import { getUsageSummary, getAlerts, getForecasts, getZipAverages, getAdminStats } from '../services/api';
+import { getDashboard, getAdminStats } from '../services/api';
 
 const TYPE_COLORS = {
   Residential: 'bg-blue-50 border-blue-200 text-blue-800',
@@ -29,17 +29,12 @@ function Dashboard() {
 
       // For customers, load their data
       if (user?.role === 'customer') {
-        const [summaryRes, alertsRes, forecastsRes, zipRes] = await Promise.all([
-          getUsageSummary().catch(() => ({ data: { summary: null } })),
-          getAlerts({ status: 'new' }).catch(() => ({ data: { alerts: [] } })),
-          getForecasts().catch(() => ({ data: { forecasts: [] } })),
-          getZipAverages().catch(() => ({ data: { zip_code: null, averages: [] } })),
-        ]);
-        setSummary(summaryRes.data.summary);
-        setAlerts(alertsRes.data.alerts || []);
-        setForecasts(forecastsRes.data.forecasts?.slice(0, 5) || []);
-        if (zipRes.data.zip_code) {
-          setZipAverages(zipRes.data);
+        const { data } = await getDashboard({ sections: 'summary,alerts,forecasts,peers' });
+        setSummary(data.summary?.summary || null);
+        setAlerts(data.alerts || []);
+        setForecasts(data.forecasts?.slice(0, 5) || []);
+        if (data.peers?.zip_code) {
+          setZipAverages(data.peers);
         }
       }
       // For admin/billing, load system stats
@@ -198,6 +193,11 @@ function Dashboard() {
                     {stat.avg_monthly_usage_ccf.toFixed(2)} CCF avg usage
                   </p>
                   <p className="text-xs mt-2 opacity-70">{stat.customer_count} customer{stat.customer_count !== 1 ? 's' : ''}</p>
+                  {zipAverages.your_position?.customer_type === type && zipAverages.your_position.bill_percentile != null && (
+                    <p className="text-xs mt-2 font-semibold">
+                      Your average bill is higher than {Math.round(zipAverages.your_position.bill_percentile)}% of bills here
+                    </p>
+                  )}
                 </div>
               );
             })}
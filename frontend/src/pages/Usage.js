@@ -222,7 +222,8 @@ function Usage() {
 
   // Admin state
   const [topCustomers, setTopCustomers] = useState([]);
-  const [allCustomers, setAllCustomers] = useState([]);
+  const [topAsOf, setTopAsOf] = useState(null);
+  const [filteredCustomers, setFilteredCustomers] = useState([]);
   const [selectedCustomer, setSelectedCustomer] = useState(null);
   const [customerSearch, setCustomerSearch] = useState('');
 
@@ -242,13 +243,9 @@ function Usage() {
     setLoading(true);
     setError(null);
     try {
-      const params = getDateParams(dateRange);
-      const [topRes, customersRes] = await Promise.all([
-        getTopCustomers(params),
-        getAdminCharges(),
-      ]);
+      const topRes = await getTopCustomers({ window: `last_${dateRange}_days` });
       setTopCustomers(topRes.data.top_customers || []);
-      setAllCustomers(customersRes.data.customers || []);
+      setTopAsOf(topRes.data.as_of || null);
     } catch (err) {
       setError(err.response?.data?.error || 'Failed to load usage data');
     } finally {
@@ -274,16 +271,18 @@ function Usage() {
     }
   };
 
-  const filteredCustomers = useMemo(() => {
-    if (!customerSearch) return [];
-    const q = customerSearch.toLowerCase();
-    return allCustomers
-      .filter(c =>
-        (c.customer_name || '').toLowerCase().includes(q) ||
-        (c.email || '').toLowerCase().includes(q)
-      )
-      .slice(0, 8);
-  }, [customerSearch, allCustomers]);
+  useEffect(() => {
+    if (!isAdmin || !customerSearch) {
+      setFilteredCustomers([]);
+      return undefined;
+    }
+    const timer = setTimeout(() => {
+      getAdminCharges({ search: customerSearch, per_page: 8 })
+        .then(res => setFilteredCustomers(res.data.customers || []))
+        .catch(() => setFilteredCustomers([]));
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [customerSearch, isAdmin]);
 
   const topChartData = useMemo(() =>
     topCustomers.slice(0, 15).map(c => ({
@@ -350,7 +349,10 @@ function Usage() {
         <>
           {/* Top customers horizontal bar chart */}
           <div className="card mb-6">
-            <h2 className="text-xl font-semibold mb-4">Top 15 Customers by Usage</h2>
+            <h2 className="text-xl font-semibold mb-4">
+              Top 15 Customers by Usage
+              {topAsOf && <span className="text-sm font-normal text-gray-500 ml-2">as of {topAsOf}</span>}
+            </h2>
             {topChartData.length === 0 ? (
               <p className="text-gray-500">No usage data found for this period.</p>
             ) : (
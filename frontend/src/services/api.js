@@ -26,6 +26,7 @@ export const getCurrentUser = () => api.get('/auth/me');
 // Usage
 export const getUsage = (params) => api.get('/usage', { params });
 export const getUsageSummary = (params) => api.get('/usage/summary', { params });
+export const getUsageSeries = (params) => api.get('/usage/series', { params });
 export const getTopCustomers = (params) => api.get('/usage/top-customers', { params });
 export const getZipAverages = (params) => api.get('/usage/zip-averages', { params });
 
@@ -44,7 +45,8 @@ export const acknowledgeAlert = (id) => api.post(`/alerts/${id}/acknowledge`);
 
 // Admin
 export const getUsers = () => api.get('/admin/users');
-export const getAdminCharges = () => api.get('/admin/charges');
+export const getAdminCharges = (params) => api.get('/admin/charges', { params });
+export const getCustomerCharges = (customerId) => api.get(`/admin/charges/${customerId}/bills`);
 export const setCustomerRate = (customerId, data) => api.put(`/admin/customers/${customerId}/rate`, data);
 export const getZipRates = () => api.get('/admin/zip-rates');
 export const createZipRate = (data) => api.post('/admin/zip-rates', data);
@@ -52,6 +54,7 @@ export const updateZipRate = (id, data) => api.put(`/admin/zip-rates/${id}`, dat
 export const deleteZipRate = (id) => api.delete(`/admin/zip-rates/${id}`);
 export const getZipAnalytics = () => api.get('/admin/zip-analytics');
 export const getAdminStats = () => api.get('/admin/stats');
+export const getDashboard = (params) => api.get('/dashboard', { params });
 export const approveUser = (id) => api.post(`/admin/users/${id}/approve`);
 export const createUser = (data) => api.post('/admin/users', data);
 export const importData = (formData) => api.post('/admin/import/usage', formData, {